@@ -3,7 +3,8 @@
 """
 import asyncio
 import sys
-from typing import Optional
+from dataclasses import fields
+from typing import Dict, FrozenSet, Optional, Type
 
 import click
 from rich.console import Console
@@ -15,13 +16,47 @@ import os
 from .core.agent import AgentBuilder
 from .core.config import config_manager
 from .output.terminal import TerminalOutput
+from .plugins.base import load_plugin_class
+from .providers.base import BaseProvider
 from .providers.openai import OpenAIProvider
 from .providers.deepseek import DeepSeekProvider
 from .providers.sustech import SustechProvider
 from .providers.ark import ArkProvider
 
+try:
+    import uvloop
+except ImportError:  # Windows等平台不提供uvloop
+    uvloop = None
+
 console = Console()
 
+# 交互模式的历史记录文件
+HISTORY_FILE = os.path.expanduser("~/.ai_agent_history")
+
+# 支持的AI提供商
+PROVIDERS: Dict[str, Type[BaseProvider]] = {
+    "openai": OpenAIProvider,
+    "deepseek": DeepSeekProvider,
+    "sustech": SustechProvider,
+    "ark": ArkProvider,
+}
+
+# 各提供商支持的模型
+PROVIDER_MODELS: Dict[str, FrozenSet[str]] = {
+    "openai": frozenset({"gpt-3.5-turbo", "gpt-4"}),
+    "deepseek": frozenset({"deepseek-chat", "deepseek-coder"}),
+    "sustech": frozenset({"deepseek-r1-250120"}),
+    "ark": frozenset({"claude-2.1"}),
+}
+
+# 各提供商对应的API密钥环境变量
+API_KEY_ENV_VARS: Dict[str, str] = {
+    "openai": "OPENAI_API_KEY",
+    "deepseek": "DEEPSEEK_API_KEY",
+    "sustech": "SUSTECH_API_KEY",
+    "ark": "ARK_API_KEY",
+}
+
 def print_error(message: str) -> None:
     """打印错误信息。"""
     console.print(f"[red]错误:[/red] {message}")
@@ -30,6 +65,13 @@ def print_warning(message: str) -> None:
     """打印警告信息。"""
     console.print(f"[yellow]警告:[/yellow] {message}")
 
+async def run_with_shared_session(coro):
+    """运行协程，结束后关闭提供商共享的HTTP会话。"""
+    try:
+        return await coro
+    finally:
+        await BaseProvider.close_session()
+
 def validate_model(provider: str, model: str) -> bool:
     """
     验证模型是否被提供商支持。
@@ -41,16 +83,11 @@ def validate_model(provider: str, model: str) -> bool:
     Returns:
         bool: 模型有效返回True，否则返回False
     """
-    provider_models = {
-        "openai": ["gpt-3.5-turbo", "gpt-4"],
-        "deepseek": ["deepseek-chat", "deepseek-coder"],
-        "sustech": ["deepseek-r1-250120"],
-        "ark": ["claude-2.1"]
-    }
-    if model == "ark":
+    # Ark的模型名为用户自己的推理接入点ID，不做限制
+    if provider == "ark":
         return True
     
-    return model in provider_models.get(provider, [])
+    return model in PROVIDER_MODELS.get(provider, frozenset())
 
 def setup_agent(
     provider: Optional[str] = None,
@@ -77,7 +114,7 @@ def setup_agent(
     
     # 2. 命令行参数覆盖配置文件
     if provider:
-        if provider not in ["openai", "deepseek", "sustech", "ark"]:
+        if provider not in PROVIDERS:
             print_error(f"不支持的AI提供商：{provider}")
             sys.exit(1)
         config_manager.config.provider = provider
@@ -86,13 +123,7 @@ def setup_agent(
         if not validate_model(config_manager.config.provider, model):
             print_error(f"提供商 {config_manager.config.provider} 不支持模型：{model}")
             print_warning("可用模型：")
-            provider_models = {
-                "openai": ["gpt-3.5-turbo", "gpt-4"],
-                "deepseek": ["deepseek-chat", "deepseek-coder"],
-                "sustech": ["deepseek-r1-250120"],
-                "ark": ["claude-2.1"]
-            }
-            for m in provider_models.get(config_manager.config.provider, []):
+            for m in sorted(PROVIDER_MODELS.get(config_manager.config.provider, ())):
                 print_warning(f"  - {m}")
             sys.exit(1)
         config_manager.config.model = model
@@ -105,12 +136,7 @@ def setup_agent(
     # 3. 验证必要的配置
     if not config_manager.config.api_key:
         provider = config_manager.config.provider
-        env_var = {
-            "openai": "OPENAI_API_KEY",
-            "deepseek": "DEEPSEEK_API_KEY",
-            "sustech": "SUSTECH_API_KEY",
-            "ark": "ARK_API_KEY"
-        }.get(provider, "API_KEY")
+        env_var = API_KEY_ENV_VARS.get(provider, "API_KEY")
         print_error(f"未设置API密钥。请设置{env_var}环境变量或在配置文件中指定。")
         sys.exit(1)
     
@@ -118,14 +144,7 @@ def setup_agent(
     builder = AgentBuilder()
     
     # 5. 设置AI提供商
-    provider_map = {
-        "openai": OpenAIProvider,
-        "deepseek": DeepSeekProvider,
-        "sustech": SustechProvider,
-        "ark": ArkProvider
-    }
-    
-    provider_class = provider_map.get(config_manager.config.provider)
+    provider_class = PROVIDERS.get(config_manager.config.provider)
     if provider_class:
         provider = provider_class(config_manager.get_provider_config())
         builder.with_provider(provider)
@@ -140,9 +159,7 @@ def setup_agent(
     # 7. 加载插件
     for plugin_name in config_manager.config.plugins:
         try:
-            # 动态导入插件模块
-            module = __import__(f"ai_agent.plugins.{plugin_name}", fromlist=["Plugin"])
-            plugin = module.Plugin()
+            plugin = load_plugin_class(plugin_name)()
             builder.with_plugin(plugin)
         except ImportError:
             print_warning(f"找不到插件：{plugin_name}")
@@ -194,19 +211,15 @@ def chat(
         else:
             # 交互式模式
             console.print("[blue]欢迎使用AI代理。输入'exit'或按Ctrl+C退出。[/blue]")
+            # 创建prompt session，整个交互过程中复用
+            session = PromptSession(
+                history=FileHistory(HISTORY_FILE),
+                auto_suggest=AutoSuggestFromHistory(),
+                enable_history_search=True,
+                complete_while_typing=True,
+            )
             while True:
                 try:
-                    # 创建历史记录文件
-                    history_file = os.path.expanduser("~/.ai_agent_history")
-                    
-                    # 创建prompt session
-                    session = PromptSession(
-                        history=FileHistory(history_file),
-                        auto_suggest=AutoSuggestFromHistory(),
-                        enable_history_search=True,
-                        complete_while_typing=True,
-                    )
-                    
                     # 获取用户输入
                     user_input = await session.prompt_async(">>> ")
                     if user_input.strip().lower() in ("exit", "quit"):
@@ -225,7 +238,7 @@ def chat(
 
     # 4. 运行事件循环
     try:
-        asyncio.run(run_chat())
+        asyncio.run(run_with_shared_session(run_chat()))
     except KeyboardInterrupt:
         console.print("\n[blue]再见！[/blue]")
     except Exception as e:
@@ -237,8 +250,9 @@ def chat(
                 if not prompt:
                     # 生成总结并保存对话
                     if hasattr(agent, '_generate_summary'):
-                        asyncio.run(agent._generate_summary())
+                        asyncio.run(run_with_shared_session(agent._generate_summary()))
                     if hasattr(agent, '_save_conversation'):
+                        # 事件循环已结束，直接写入文件
                         save_path = agent._save_conversation()
                         if save_path:
                             console.print(f"\n[green]对话已保存到：{save_path}[/green]")
@@ -267,12 +281,17 @@ def config(config: Optional[str]):
     else:
         # 显示当前配置
         console.print("当前配置：")
-        for key, value in config_manager.config.__dict__.items():
-            if not key.startswith("_"):
-                console.print(f"  {key}: {value}")
+        for field in fields(config_manager.config):
+            console.print(f"  {field.name}: {getattr(config_manager.config, field.name)}")
+
+def install_event_loop_policy() -> None:
+    """如果可用，则使用uvloop作为asyncio事件循环策略。"""
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 def main():
     """主入口函数。"""
+    install_event_loop_policy()
     cli()
 
 if __name__ == "__main__":
@@ -3,14 +3,52 @@ AI代理的核心实现。
 """
 import asyncio
 import os
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, AsyncGenerator
+from typing import Any, Dict, List, Optional, AsyncGenerator, Tuple
 
 from ..output.base import BaseOutput, OutputManager
 from ..plugins.base import BasePlugin, PluginManager
 from ..providers.base import BaseProvider, ProviderError
 
+# 流式输出时每个输出处理器队列的最大长度
+STREAM_QUEUE_SIZE = 64
+
+# 流结束标记
+_STREAM_END = object()
+
+# 对话记录的默认保存目录
+DEFAULT_SAVE_DIR = os.path.expanduser("~/ai-agent/conversations")
+
+# 默认保留的最大对话轮数
+DEFAULT_MAX_HISTORY_TURNS = 20
+
+# 压缩较早对话历史时使用的提示
+HISTORY_SUMMARY_PROMPT = "请简要总结以上对话的要点，以便后续对话参考："
+
+# 保存对话时各角色显示的名称
+_ROLE_NAMES = {"user": "用户", "assistant": "助手", "system": "此前对话总结"}
+
+# 将文本切分为以空格或标点结尾的片段
+_CHUNK_PATTERN = re.compile(r"[^ \n.!?]*[ \n.!?]|[^ \n.!?]+\Z")
+
+async def _iter_queue(queue: asyncio.Queue) -> AsyncGenerator[str, None]:
+    """
+    将队列转换为异步迭代器，直到收到流结束标记。
+    
+    Args:
+        queue: 内容队列
+        
+    Yields:
+        str: 队列中的每个片段
+    """
+    while True:
+        chunk = await queue.get()
+        if chunk is _STREAM_END:
+            return
+        yield chunk
+
 class Agent:
     """AI代理核心类，负责协调各个组件的工作。"""
     
@@ -37,6 +75,13 @@ class Agent:
         self.conversation = []  # 用于保存对话历史
         self.start_time = datetime.now()  # 会话开始时间
         self.summary = None  # 对话总结
+        # 对话历史的最大轮数，超过后较早的消息会被压缩为一条总结；为0或None时不限制
+        self.max_history_turns = self.config.get("max_history_turns", DEFAULT_MAX_HISTORY_TURNS)
+        # 对话记录保存目录，未配置时使用默认目录
+        save_dir = self.config.get("save_dir")
+        self.save_dir = os.path.expanduser(save_dir) if save_dir else DEFAULT_SAVE_DIR
+        self._cached_outputs: Optional[List[BaseOutput]] = None  # 默认输出处理器列表缓存
+        self.output_manager.add_listener(self._invalidate_outputs)
         
     async def process(self, input_text: str, output_name: Optional[str] = None) -> str:
         """
@@ -60,16 +105,19 @@ class Agent:
             processed_output = self._apply_post_process(response)
             self.conversation.append({"role": "assistant", "content": processed_output})
             
-            # 4. 输出结果
-            outputs = []
-            if isinstance(self.config.get("output"), list):
-                outputs = [self.output_manager.get_output(name) for name in self.config["output"]]
-            else:
-                outputs = [self.output_manager.get_output(output_name)]
-            
-            for output in outputs:
-                await output.render(processed_output)
+            # 4. 并发输出到所有输出处理器，任一失败时取消其余任务
+            tasks = [
+                asyncio.create_task(output.render(processed_output))
+                for output in self._resolve_outputs(output_name)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
             
+            await self._trim_history()
             return processed_output
             
         except Exception as e:
@@ -99,47 +147,47 @@ class Agent:
 
         try:
             # 2. 获取所有输出处理器
-            outputs = []
-            if isinstance(self.config.get("output"), list):
-                outputs = [self.output_manager.get_output(name) for name in self.config["output"]]
-            else:
-                outputs = [self.output_manager.get_output(output_name)]
+            outputs = self._resolve_outputs(output_name)
             
             # 3. 流式生成并处理回答（使用当前历史）
             response_stream = self.provider.stream_response(processed_input, self.conversation)
             
             # 4. 流式输出并收集完整文本
             text_parts = []
-            chunks = []
             
             # 更新对话历史
             self.conversation.append({"role": "user", "content": processed_input})
             
-            # 复制流内容以供后续使用
-            async for chunk in response_stream:
-                text_parts.append(chunk)
-                chunks.append(chunk)
+            # 每个输出处理器一个队列，由单个生产者边接收边分发
+            queues = [asyncio.Queue(maxsize=STREAM_QUEUE_SIZE) for _ in outputs]
             
-            # 创建独立的流生成器
-            async def create_stream():
-                for chunk in chunks:
-                    await asyncio.sleep(0.01)  # 模拟真实流式传输
-                    yield chunk
+            async def produce():
+                async for chunk in response_stream:
+                    text_parts.append(chunk)
+                    for queue in queues:
+                        await queue.put(chunk)
+                for queue in queues:
+                    await queue.put(_STREAM_END)
             
-            # 为每个输出处理器创建独立的流
-            stream_tasks = []
-            for output in outputs:
-                stream = create_stream()
-                task = asyncio.create_task(output.render_stream(stream))
-                stream_tasks.append(task)
+            tasks = [asyncio.create_task(produce())]
+            for output, queue in zip(outputs, queues):
+                tasks.append(asyncio.create_task(output.render_stream(_iter_queue(queue))))
             
-            # 等待所有输出处理完成
-            await asyncio.gather(*stream_tasks)
+            # 等待生产者和所有输出处理完成，任一失败时取消其余任务
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
 
             # 返回完整响应文本并更新对话历史
             final_text = "".join(text_parts).strip()
+            if any(not plugin.streaming_safe for plugin in self._get_sorted_plugins()):
+                final_text = self._apply_post_process(final_text)
             self.conversation.append({"role": "assistant", "content": final_text})
             
+            await self._trim_history()
             return final_text
             
         except Exception as e:
@@ -149,6 +197,26 @@ class Agent:
             await output.render(error_message)
             raise
             
+    async def _trim_history(self) -> None:
+        """
+        对话历史超过最大轮数时，将较早的消息压缩为一条系统总结消息。
+        
+        保留最近一半轮数的完整消息；生成总结失败时直接丢弃较早的消息。
+        """
+        if not self.max_history_turns or len(self.conversation) <= 2 * self.max_history_turns:
+            return
+        
+        keep = 2 * max(1, self.max_history_turns // 2)
+        earlier, recent = self.conversation[:-keep], self.conversation[-keep:]
+        try:
+            summary = await self.provider.generate_response(HISTORY_SUMMARY_PROMPT, earlier)
+        except Exception as e:
+            print(f"压缩对话历史失败：{e}")
+            self.conversation[:] = recent
+            return
+        
+        self.conversation[:] = [{"role": "system", "content": summary}, *recent]
+    
     async def _chunk_to_stream(self, text: str) -> AsyncGenerator[str, None]:
         """
         将文本转换为流式输出。
@@ -159,15 +227,9 @@ class Agent:
         Yields:
             str: 每个输出片段
         """
-        # 按空格或标点分割文本
-        buffer = ""
-        for char in text:
-            buffer += char
-            if char in (" ", "\n", ".", "!", "?"):
-                yield buffer
-                buffer = ""
-        if buffer:  # 输出剩余内容
-            yield buffer
+        # 按空格或标点分割文本，末尾不以断句符号结束的部分单独输出
+        for match in _CHUNK_PATTERN.finditer(text):
+            yield match.group(0)
     
     def _apply_pre_process(self, input_text: str) -> str:
         """
@@ -179,14 +241,7 @@ class Agent:
         Returns:
             str: 处理后的文本
         """
-        current_text = input_text
-        for plugin in self._get_sorted_plugins():
-            try:
-                current_text = plugin.pre_process(current_text)
-            except Exception as e:
-                # 记录错误但继续处理
-                print(f"插件 {plugin.__class__.__name__} 预处理失败: {e}")
-        return current_text
+        return self._run_plugins(input_text, "pre_process", "预处理")
     
     def _apply_post_process(self, output_text: str) -> str:
         """
@@ -198,24 +253,76 @@ class Agent:
         Returns:
             str: 处理后的文本
         """
-        current_text = output_text
-        for plugin in self._get_sorted_plugins():
+        return self._run_plugins(output_text, "post_process", "后处理")
+    
+    def _run_plugins(self, text: str, method_name: str, stage: str) -> str:
+        """
+        按优先级依次调用所有插件的指定处理方法。
+        
+        某个插件失败时记录错误，并用上一个插件的结果继续处理。
+        
+        Args:
+            text: 待处理的文本
+            method_name: 插件方法名称，pre_process 或 post_process
+            stage: 用于错误信息的处理阶段名称
+            
+        Returns:
+            str: 处理后的文本
+        """
+        plugins = self._get_sorted_plugins()
+        if not plugins:
+            return text
+        
+        current_text = text
+        for plugin in plugins:
             try:
-                current_text = plugin.post_process(current_text)
+                current_text = getattr(plugin, method_name)(current_text)
             except Exception as e:
                 # 记录错误但继续处理
-                print(f"插件 {plugin.__class__.__name__} 后处理失败: {e}")
+                print(f"插件 {plugin.__class__.__name__} {stage}失败: {e}")
         return current_text
     
-    def _get_sorted_plugins(self) -> List[BasePlugin]:
+    def _resolve_outputs(self, output_name: Optional[str] = None) -> List[BaseOutput]:
+        """
+        获取本次处理使用的输出处理器列表。
+        
+        未指定输出处理器名称时结果会被缓存，直到输出处理器发生变更。
+        
+        Args:
+            output_name: 指定使用的输出处理器名称
+            
+        Returns:
+            List[BaseOutput]: 输出处理器列表
+            
+        Raises:
+            KeyError: 当输出处理器不存在时抛出
+        """
+        if output_name is None and self._cached_outputs is not None:
+            return self._cached_outputs
+        
+        if isinstance(self.config.get("output"), list):
+            outputs = [self.output_manager.get_output(name) for name in self.config["output"]]
+        else:
+            outputs = [self.output_manager.get_output(output_name)]
+        
+        if output_name is None:
+            self._cached_outputs = outputs
+        return outputs
+    
+    def _invalidate_outputs(self) -> None:
+        """使输出处理器列表缓存失效。"""
+        self._cached_outputs = None
+    
+    def _get_sorted_plugins(self) -> Tuple[BasePlugin, ...]:
         """
         获取按优先级排序的插件列表。
         
+        排序结果由插件管理器在插件变更时重建。
+        
         Returns:
-            List[BasePlugin]: 排序后的插件列表
+            Tuple[BasePlugin, ...]: 排序后的插件元组
         """
-        plugins = list(self.plugin_manager.list_plugins().values())
-        return sorted(plugins, key=lambda x: x.priority)
+        return self.plugin_manager.sorted_plugins()
     
     def add_plugin(self, plugin: BasePlugin) -> None:
         """
@@ -261,41 +368,34 @@ class Agent:
             print(f"生成总结失败：{e}")
             return "未总结对话"
 
-    def _save_conversation(self) -> str:
+    def _save_conversation(self) -> Optional[str]:
         """保存对话历史到文件。"""
         if not self.conversation:
-            return
+            return None
             
         # 创建保存目录
-        save_dir = os.path.expanduser("~/ai-agent/conversations")
-        os.makedirs(save_dir, exist_ok=True)
+        save_dir = Path(self.save_dir)
+        save_dir.mkdir(parents=True, exist_ok=True)
         
         # 生成文件名
-        date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        end_time = datetime.now()
+        date_str = end_time.strftime("%Y-%m-%d_%H-%M-%S")
         summary = self.summary or "未总结对话"
-        file_name = f"{summary}_{date_str}.md"
-        file_path = os.path.join(save_dir, file_name)
-        
-        # 生成Markdown内容
-        content = [
-            f"# {summary}",
-            f"开始时间：{self.start_time.strftime('%Y-%m-%d %H:%M:%S')}",
-            f"结束时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-            "## 对话内容",
-            ""
-        ]
-        
-        # 添加对话记录
-        for msg in self.conversation:
-            role_name = "用户" if msg["role"] == "user" else "助手"
-            content.append(f"**{role_name}**: {msg['content']}\n")
-        
-        # 保存文件
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(content))
-        
-        return file_path
+        file_path = save_dir / f"{summary}_{date_str}.md"
+        
+        # 逐段写入Markdown内容
+        with file_path.open("w", encoding="utf-8") as f:
+            f.write(f"# {summary}\n")
+            f.write(f"开始时间：{self.start_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"结束时间：{end_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("\n## 对话内容\n")
+            
+            # 添加对话记录
+            for msg in self.conversation:
+                role_name = _ROLE_NAMES.get(msg["role"], "助手")
+                f.write(f"\n**{role_name}**: {msg['content']}\n")
+        
+        return str(file_path)
 
 class AgentBuilder:
     """AI代理构建器，用于简化Agent实例的创建过程。"""
@@ -1,13 +1,47 @@
 """
 配置管理模块。
 """
+import copy
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
+import tomli_w
 from dotenv import load_dotenv
 
+# Python 3.11+ 使用标准库tomllib，旧版本回退到API相同的tomli
+try:
+    import tomllib
+except ImportError:  # pragma: no cover - Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:  # pragma: no cover - 未安装时仅影响配置文件读取
+        tomllib = None
+
+def _split_list(value: str) -> list:
+    """将逗号分隔的字符串转换为列表。"""
+    return value.split(",")
+
+def _parse_bool(value: str) -> bool:
+    """将字符串转换为布尔值。"""
+    return value.lower() in ("true", "1", "yes")
+
+# 环境变量到配置项的映射：(环境变量, 配置项, 转换函数, 是否覆盖已有值)
+_ENV_SPEC = (
+    ("OPENAI_API_KEY", "api_key", str, False),
+    ("AI_AGENT_PROVIDER", "provider", str, True),
+    ("AI_AGENT_MODEL", "model", str, True),
+    ("AI_AGENT_PLUGINS", "plugins", _split_list, True),
+    ("AI_AGENT_OUTPUT", "output", str, True),
+    ("AI_AGENT_TEMPERATURE", "temperature", float, True),
+    ("AI_AGENT_MAX_TOKENS", "max_tokens", int, True),
+    ("AI_AGENT_STREAM", "stream", _parse_bool, True),
+)
+
+# 已解析的配置文件缓存：(文件路径, 修改时间, 文件大小) -> 配置字典
+_CONFIG_FILE_CACHE: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
 @dataclass
 class Config:
     """配置类，存储所有配置项。"""
@@ -56,44 +90,19 @@ class ConfigManager:
     
     def _load_env_vars(self) -> None:
         """从环境变量加载配置。"""
-        # API密钥
-        if api_key := os.getenv("OPENAI_API_KEY"):
-            if not self.config.api_key:  # 只有在未设置时才从环境变量加载
-                self.config.api_key = api_key
-        
-        # 提供商
-        if provider := os.getenv("AI_AGENT_PROVIDER"):
-            self.config.provider = provider
-            
-        # 模型
-        if model := os.getenv("AI_AGENT_MODEL"):
-            self.config.model = model
-            
-        # 插件
-        if plugins := os.getenv("AI_AGENT_PLUGINS"):
-            self.config.plugins = plugins.split(",")
-            
-        # 输出方式
-        if output := os.getenv("AI_AGENT_OUTPUT"):
-            self.config.output = output
-            
-        # 温度
-        if temp := os.getenv("AI_AGENT_TEMPERATURE"):
-            try:
-                self.config.temperature = float(temp)
-            except ValueError:
-                pass
-                
-        # 最大token数
-        if max_tokens := os.getenv("AI_AGENT_MAX_TOKENS"):
+        env = os.environ
+        config = self.config
+        for env_key, attr, convert, override in _ENV_SPEC:
+            value = env.get(env_key)
+            if not value:
+                continue
+            # 部分配置项只有在未设置时才从环境变量加载
+            if not override and getattr(config, attr):
+                continue
             try:
-                self.config.max_tokens = int(max_tokens)
+                setattr(config, attr, convert(value))
             except ValueError:
                 pass
-                
-        # 是否流式输出
-        if stream := os.getenv("AI_AGENT_STREAM"):
-            self.config.stream = stream.lower() in ("true", "1", "yes")
     
     def _load_config_file(self, config_path: str) -> None:
         """
@@ -102,16 +111,23 @@ class ConfigManager:
         Args:
             config_path: 配置文件路径
         """
-        import tomli
-        
         try:
-            with open(config_path, "rb") as f:
-                file_config = tomli.load(f)
+            if tomllib is None:
+                raise ImportError("未安装tomli，无法解析TOML配置文件")
+            
+            # 文件未变化时复用上次的解析结果
+            stat = os.stat(config_path)
+            cache_key = (os.path.abspath(config_path), stat.st_mtime_ns, stat.st_size)
+            file_config = _CONFIG_FILE_CACHE.get(cache_key)
+            if file_config is None:
+                with open(config_path, "rb") as f:
+                    file_config = tomllib.load(f)
+                _CONFIG_FILE_CACHE[cache_key] = file_config
             
             # 更新配置
             for key, value in file_config.items():
                 if hasattr(self.config, key):
-                    setattr(self.config, key, value)
+                    setattr(self.config, key, copy.deepcopy(value))
                     
         except Exception as e:
             print(f"加载配置文件失败: {e}")
@@ -138,8 +154,6 @@ class ConfigManager:
         Args:
             config_path: 配置文件路径，如果为None则使用默认路径
         """
-        import tomli_w
-        
         path = Path(config_path or self.DEFAULT_CONFIG_PATH)
         
         # 确保目录存在
@@ -147,9 +161,8 @@ class ConfigManager:
         
         # 将配置转换为字典
         config_dict = {
-            key: value
-            for key, value in self.config.__dict__.items()
-            if not key.startswith("_")
+            field.name: getattr(self.config, field.name)
+            for field in fields(self.config)
         }
         
         # 保存配置
@@ -2,7 +2,7 @@
 输出处理的基础接口定义。
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 class BaseOutput(ABC):
     """输出处理的基础接口类。
@@ -34,6 +34,9 @@ class BaseOutput(ABC):
         """
         流式渲染内容。
         
+        内容流按提供商返回的速度产生，代理不会额外添加延迟；
+        如需控制输出节奏，应在具体的输出处理器中实现。
+        
         Args:
             content_stream: 要输出的内容流
         """
@@ -55,6 +58,21 @@ class OutputManager:
         """初始化输出管理器。"""
         self._outputs: Dict[str, BaseOutput] = {}
         self._default_output: Optional[str] = None
+        self._listeners: List[Callable[[], None]] = []
+    
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """
+        添加输出处理器变更监听器。
+        
+        Args:
+            callback: 输出处理器注册、注销或默认值变更后调用的回调函数
+        """
+        self._listeners.append(callback)
+    
+    def _notify(self) -> None:
+        """通知所有监听器输出处理器已变更。"""
+        for callback in self._listeners:
+            callback()
     
     def register(self, name: str, output: BaseOutput, default: bool = False) -> None:
         """
@@ -74,6 +92,7 @@ class OutputManager:
         self._outputs[name] = output
         if default or self._default_output is None:
             self._default_output = name
+        self._notify()
     
     def unregister(self, name: str) -> None:
         """
@@ -86,11 +105,12 @@ class OutputManager:
             KeyError: 当输出处理器不存在时抛出
             ValueError: 当尝试注销默认输出处理器时抛出
         """
-        if name not in self._outputs:
-            raise KeyError(f"Output {name} not found")
         if name == self._default_output:
             raise ValueError("Cannot unregister default output")
-        del self._outputs[name]
+        # 默认输出处理器一定已注册，因此先检查默认值不影响KeyError的判断
+        if self._outputs.pop(name, None) is None:
+            raise KeyError(f"Output {name} not found")
+        self._notify()
     
     def get_output(self, name: Optional[str] = None) -> BaseOutput:
         """
@@ -106,9 +126,10 @@ class OutputManager:
             KeyError: 当输出处理器不存在时抛出
         """
         output_name = name or self._default_output
-        if not output_name or output_name not in self._outputs:
+        output = self._outputs.get(output_name) if output_name else None
+        if output is None:
             raise KeyError(f"Output {output_name} not found")
-        return self._outputs[output_name]
+        return output
     
     def set_default(self, name: str) -> None:
         """
@@ -123,6 +144,7 @@ class OutputManager:
         if name not in self._outputs:
             raise KeyError(f"Output {name} not found")
         self._default_output = name
+        self._notify()
 
 class OutputError(Exception):
     """输出处理相关的异常类。"""
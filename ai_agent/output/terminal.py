@@ -2,16 +2,35 @@
 终端输出处理器实现。
 """
 import asyncio
+import re
 from typing import Any, Dict, Optional
 
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
 from rich.style import Style
-from rich.syntax import Syntax
 
 from .base import BaseOutput, register_output
 
+# 流式输出的合并阈值：缓冲字符数与不含断句符号时的刷新间隔（秒）
+FLUSH_SIZE = 256
+FLUSH_INTERVAL = 0.016
+
+# 断句符号，流式片段以这些字符结尾时可以输出
+FLUSH_CHARS = frozenset(" \n.!?")
+
+# Markdown标记：标题(##)、强调或列表(*)、强调(_)、代码(`)、引用(>)、列表或分隔线(-)、链接和图片([)
+_MARKDOWN_PATTERN = re.compile(r"##|[*_`>\-\[]")
+
+# 行首的代码块围栏
+_CODE_FENCE_PATTERN = re.compile(r"^```", re.MULTILINE)
+
+# 预先构建的样式，避免每次渲染时解析样式字符串
+_DEFAULT_STYLE = Style(color="cyan")
+_MARKDOWN_BORDER_STYLE = Style(color="blue")
+_CODE_BORDER_STYLE = Style(color="green")
+
+# 代码块高亮主题
+CODE_THEME = "monokai"
+
 @register_output("terminal")
 class TerminalOutput(BaseOutput):
     """终端输出处理器，使用rich库实现富文本显示。"""
@@ -28,7 +47,7 @@ class TerminalOutput(BaseOutput):
         """
         super().__init__(config)
         self.console = Console(**config if config else {})
-        self.default_style = Style(color="cyan")
+        self.default_style = _DEFAULT_STYLE
         
     async def render(self, content: str) -> None:
         """
@@ -41,13 +60,20 @@ class TerminalOutput(BaseOutput):
         """
         # 检测内容是否为Markdown格式
         if self._is_markdown(content):
-            # 渲染Markdown
+            # 渲染Markdown（markdown-it解析器较重，首次用到时才导入）
+            from rich.markdown import Markdown
+            from rich.panel import Panel
+            
             markdown = Markdown(content)
             await asyncio.get_event_loop().run_in_executor(None, 
-                lambda: self.console.print(Panel(markdown, border_style="blue")))
+                lambda: self.console.print(Panel(markdown, border_style=_MARKDOWN_BORDER_STYLE)))
         else:
             # 检测是否包含代码块
             if "```" in content:
+                # pygments较重，首次用到时才导入
+                from rich.panel import Panel
+                from rich.syntax import Syntax
+                
                 parts = self._split_code_blocks(content)
                 for part in parts:
                     if part.startswith("```") and part.endswith("```"):
@@ -56,9 +82,9 @@ class TerminalOutput(BaseOutput):
                         lang = lines[0][3:].strip() or "text"
                         code = "\n".join(lines[1:-1])
                         # 渲染代码块
-                        syntax = Syntax(code, lang, theme="monokai")
+                        syntax = Syntax(code, lang, theme=CODE_THEME)
                         await asyncio.get_event_loop().run_in_executor(None, 
-                            lambda: self.console.print(Panel(syntax, border_style="green")))
+                            lambda: self.console.print(Panel(syntax, border_style=_CODE_BORDER_STYLE)))
                     else:
                         await asyncio.get_event_loop().run_in_executor(None, 
                             lambda: self.console.print(part, style=self.default_style))
@@ -74,24 +100,37 @@ class TerminalOutput(BaseOutput):
         Args:
             content_stream: 内容流迭代器
         """
-        chunks = []
-        buffer = ""
+        loop = asyncio.get_running_loop()
+        # 循环内频繁使用的属性提前取到局部变量
+        run_in_executor = loop.run_in_executor
+        console_print = self.console.print
+        style = self.default_style
+        last_flush = loop.time()
+        # 待输出的片段及其总长度，输出时再拼接，避免逐片段拼接字符串
+        buffer = []
+        buffer_len = 0
         async for chunk in content_stream:
-            chunks.append(chunk)
-            buffer += chunk
-            # 当遇到断句符号时输出
-            if chunk.endswith((" ", "\n", ".", "!", "?")):
-                await asyncio.get_event_loop().run_in_executor(None, 
-                    lambda text=buffer: self.console.print(text, style=self.default_style, end=""))
-                buffer = ""
-            
-            # 添加小延迟以实现流畅的打印效果
-            await asyncio.sleep(0.01)
+            buffer.append(chunk)
+            buffer_len += len(chunk)
+            # 遇到断句符号时立即输出；没有断句符号的文本（如中文）在缓冲区足够大
+            # 或距上次输出已超过刷新间隔时输出，其余片段合并到下一次写入
+            if (
+                chunk[-1:] in FLUSH_CHARS
+                or buffer_len >= FLUSH_SIZE
+                or loop.time() - last_flush >= FLUSH_INTERVAL
+            ):
+                text = "".join(buffer)
+                await run_in_executor(None, 
+                    lambda: console_print(text, style=style, end=""))
+                buffer.clear()
+                buffer_len = 0
+                last_flush = loop.time()
         
         # 输出剩余内容
-        if buffer:
-            await asyncio.get_event_loop().run_in_executor(None, 
-                lambda: self.console.print(buffer, style=self.default_style))
+        if buffer_len:
+            text = "".join(buffer)
+            await run_in_executor(None, 
+                lambda: console_print(text, style=style))
     
     def _is_markdown(self, content: str) -> bool:
         """
@@ -103,17 +142,7 @@ class TerminalOutput(BaseOutput):
         Returns:
             bool: 是否为Markdown格式
         """
-        markdown_indicators = [
-            "##",  # 标题
-            "*",   # 强调或列表
-            "_",   # 强调
-            "`",   # 代码
-            ">",   # 引用
-            "-",   # 列表或分隔线
-            "[",   # 链接
-            "!["   # 图片
-        ]
-        return any(indicator in content for indicator in markdown_indicators)
+        return _MARKDOWN_PATTERN.search(content) is not None
     
     def _split_code_blocks(self, content: str) -> list:
         """
@@ -125,27 +154,25 @@ class TerminalOutput(BaseOutput):
         Returns:
             list: 分割后的内容列表
         """
+        # 按行首的代码块围栏切分，奇数位置为代码块内容
+        segments = _CODE_FENCE_PATTERN.split(content)
+        last = len(segments) - 1
         parts = []
-        current = []
-        in_code_block = False
-        
-        for line in content.split("\n"):
-            if line.startswith("```"):
-                if in_code_block:
-                    current.append(line)
-                    parts.append("\n".join(current))
-                    current = []
-                else:
-                    if current:
-                        parts.append("\n".join(current))
-                        current = []
-                    current.append(line)
-                in_code_block = not in_code_block
-            else:
-                current.append(line)
-        
-        if current:
-            parts.append("\n".join(current))
+        for index, segment in enumerate(segments):
+            if index % 2:
+                # 最后一个代码块未闭合时按普通文本处理
+                parts.append("```" + segment if index == last else "```" + segment + "```")
+                continue
+            if index > 0:
+                # 闭合围栏所在行只剩空白时丢弃该行，否则剩余内容按普通文本保留
+                rest, _, after = segment.partition("\n")
+                if not rest.strip():
+                    segment = after
+            if index < last:
+                # 去掉围栏前的换行
+                segment = segment[:-1]
+            if segment:
+                parts.append(segment)
             
         return parts
     
@@ -1,7 +1,7 @@
 """
 插件模块。
 """
-from .base import BasePlugin, PluginManager, PluginError, register_plugin
+from .base import BasePlugin, PluginManager, PluginError, register_plugin, load_plugin_class
 from .translator import Plugin as TranslatorPlugin
 
 __all__ = [
@@ -9,5 +9,6 @@ __all__ = [
     "PluginManager",
     "PluginError",
     "register_plugin",
+    "load_plugin_class",
     "TranslatorPlugin"
 ]
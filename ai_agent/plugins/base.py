@@ -1,8 +1,14 @@
 """
 插件系统的基础接口定义。
 """
+import importlib
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Union
+from functools import lru_cache
+from importlib.metadata import EntryPoint, entry_points
+from typing import Any, Dict, Optional, Tuple, Type, Union
+
+# 第三方插件注册使用的entry point分组
+PLUGIN_ENTRY_POINT_GROUP = "ai_agent.plugins"
 
 class BasePlugin(ABC):
     """插件基础类。
@@ -11,6 +17,10 @@ class BasePlugin(ABC):
     插件可以在AI处理前后对输入输出进行处理。
     """
     
+    # 流式处理时回答已逐段输出，默认不再对完整文本执行后处理；
+    # 必须对完整回答执行后处理的插件应将其设为False
+    streaming_safe: bool = True
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         """
         初始化插件。
@@ -83,6 +93,11 @@ class PluginManager:
     def __init__(self):
         """初始化插件管理器。"""
         self._plugins: Dict[str, BasePlugin] = {}
+        self._sorted: Tuple[BasePlugin, ...] = ()  # 按优先级排序的插件，注册和注销时重建
+        
+    def _rebuild_sorted(self) -> None:
+        """插件注册或注销后，按优先级重建排序后的插件元组。"""
+        self._sorted = tuple(sorted(self._plugins.values(), key=lambda x: x.priority))
         
     def register(self, name: str, plugin: BasePlugin) -> None:
         """
@@ -98,6 +113,7 @@ class PluginManager:
         if name in self._plugins:
             raise ValueError(f"Plugin {name} already registered")
         self._plugins[name] = plugin
+        self._rebuild_sorted()
         
     def unregister(self, name: str) -> None:
         """
@@ -109,9 +125,9 @@ class PluginManager:
         Raises:
             KeyError: 当插件不存在时抛出
         """
-        if name not in self._plugins:
+        if self._plugins.pop(name, None) is None:
             raise KeyError(f"Plugin {name} not found")
-        del self._plugins[name]
+        self._rebuild_sorted()
         
     def get_plugin(self, name: str) -> BasePlugin:
         """
@@ -126,9 +142,10 @@ class PluginManager:
         Raises:
             KeyError: 当插件不存在时抛出
         """
-        if name not in self._plugins:
+        plugin = self._plugins.get(name)
+        if plugin is None:
             raise KeyError(f"Plugin {name} not found")
-        return self._plugins[name]
+        return plugin
         
     def list_plugins(self) -> Dict[str, BasePlugin]:
         """
@@ -138,6 +155,15 @@ class PluginManager:
             Dict[str, BasePlugin]: 插件名称到插件实例的映射
         """
         return dict(self._plugins)
+        
+    def sorted_plugins(self) -> Tuple[BasePlugin, ...]:
+        """
+        获取按优先级排序的插件。
+        
+        Returns:
+            Tuple[BasePlugin, ...]: 排序后的插件元组，插件变更前返回同一对象
+        """
+        return self._sorted
 
 def register_plugin(name: str):
     """
@@ -155,3 +181,40 @@ def register_plugin(name: str):
         cls.plugin_name = name
         return cls
     return decorator
+
+@lru_cache(maxsize=None)
+def _plugin_entry_points() -> Dict[str, EntryPoint]:
+    """
+    发现通过entry point注册的插件，结果只计算一次。
+    
+    Returns:
+        Dict[str, EntryPoint]: 插件名称到entry point的映射
+    """
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        group = eps.select(group=PLUGIN_ENTRY_POINT_GROUP)
+    else:  # Python 3.9
+        group = eps.get(PLUGIN_ENTRY_POINT_GROUP, [])
+    return {ep.name: ep for ep in group}
+
+@lru_cache(maxsize=None)
+def load_plugin_class(name: str) -> Type[BasePlugin]:
+    """
+    按名称加载插件类。
+    
+    优先使用entry point注册的插件，否则从 ai_agent.plugins.<name> 模块中加载 Plugin 类。
+    
+    Args:
+        name: 插件名称
+        
+    Returns:
+        Type[BasePlugin]: 插件类
+        
+    Raises:
+        ImportError: 当找不到插件模块时抛出
+    """
+    entry_point = _plugin_entry_points().get(name)
+    if entry_point is not None:
+        return entry_point.load()
+    module = importlib.import_module(f"{__package__}.{name}")
+    return module.Plugin
@@ -1,17 +1,29 @@
 """
 AI提供商模块。
 """
-from .base import BaseProvider, ProviderError, register_provider
-from .openai import OpenAIProvider, OpenAIError, test_api_key as test_openai_key
-from .deepseek import DeepSeekProvider, test_api_key as test_deepseek_key
+from .base import (
+    BaseProvider,
+    LLMCache,
+    OpenAICompatibleProvider,
+    ProviderError,
+    cached_response,
+    register_provider,
+)
+from .openai import OpenAIProvider, OpenAIError, test_api_key as test_openai_key, test_api_keys as test_openai_keys
+from .deepseek import DeepSeekProvider, test_api_key as test_deepseek_key, test_api_keys as test_deepseek_keys
 
 __all__ = [
     "BaseProvider",
+    "LLMCache",
+    "OpenAICompatibleProvider",
     "ProviderError",
+    "cached_response",
     "register_provider",
     "OpenAIProvider",
     "OpenAIError",
     "test_openai_key",
+    "test_openai_keys",
     "DeepSeekProvider",
     "test_deepseek_key",
+    "test_deepseek_keys",
 ]
@@ -1,8 +1,248 @@
 """
 AI提供商的基础接口定义。
 """
+import asyncio
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 安装了orjson时用它加速JSON编解码，否则回退到标准库
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson为可选依赖
+    orjson = None
+
+# 安装了aiodns时使用异步DNS解析，否则使用aiohttp默认的线程池解析
+try:
+    import aiodns  # noqa: F401
+    HAS_AIODNS = True
+except ImportError:  # pragma: no cover - aiodns为可选依赖
+    HAS_AIODNS = False
+
+# 共享HTTP连接池配置
+HTTP_POOL_LIMIT = 100  # 连接总数上限
+HTTP_POOL_LIMIT_PER_HOST = 20  # 单个主机的连接数上限
+HTTP_KEEPALIVE_TIMEOUT = 75  # 空闲连接保持时间（秒）
+HTTP_DNS_CACHE_TTL = 300  # DNS解析结果缓存时间（秒）
+
+# SSE流中数据行的前缀和流结束标记
+SSE_DATA_PREFIX = b"data: "
+SSE_DONE = b"[DONE]"
+SSE_READ_SIZE = 4096  # 读取流式响应时每次读取的字节数
+_DELTA_CONTENT_MARKER = b'"content":"'  # 流式片段中内容字段的起始标记
+
+# 流式片段合并的默认配置，可通过stream_batch_ms和stream_batch_chars配置项覆盖；
+# 时间窗口为0时不合并（终端输出处理器本身已经合并写入）
+STREAM_BATCH_MS = 0  # 合并的时间窗口（毫秒）
+STREAM_BATCH_CHARS = 256  # 累积到该字符数时立即输出
+
+# 回答缓存配置：温度不高于该值时回答视为确定性结果，可以缓存
+CACHE_MAX_TEMPERATURE = 0
+RESPONSE_CACHE_SIZE = 256  # 最多缓存的回答数
+RESPONSE_CACHE_TTL = 3600  # 缓存有效期（秒）
+
+# 行内连续的空格和制表符，行首缩进不匹配
+_INLINE_SPACE_PATTERN = re.compile(r"(?<=\S)[ \t]+(?=\S)")
+
+def json_loads(data: Any) -> Any:
+    """
+    解析JSON，支持str和bytes输入。
+    
+    Args:
+        data: JSON文本
+        
+    Returns:
+        Any: 解析结果
+        
+    Raises:
+        json.JSONDecodeError: 当JSON无效时抛出（orjson的异常是其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    将对象序列化为UTF-8编码的JSON字节串，可直接作为请求体发送。
+    
+    Args:
+        obj: 要序列化的对象
+        
+    Returns:
+        bytes: JSON字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def extract_delta_content(payload: bytes) -> Optional[str]:
+    """
+    从常见格式的流式片段中直接取出内容，不解析整个JSON对象。
+    
+    只处理内容为不含转义字符的字符串这一最常见的情况；内容为null、含转义字符、
+    或片段格式不符时返回None，调用方应回退到完整的JSON解析。
+    
+    Args:
+        payload: SSE数据行的内容
+        
+    Returns:
+        Optional[str]: 片段内容，无法快速提取时返回None
+    """
+    start = payload.find(_DELTA_CONTENT_MARKER)
+    if start == -1 or not payload.endswith(b"}"):
+        return None
+    start += len(_DELTA_CONTENT_MARKER)
+    end = payload.find(b'"', start)
+    if end == -1:
+        return None
+    value = payload[start:end]
+    if b"\\" in value:
+        return None
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _serialize_json(obj: Any) -> str:
+    """
+    共享HTTP会话使用的JSON序列化函数，处理以json=参数传入的请求体。
+    
+    Args:
+        obj: 要序列化的对象
+        
+    Returns:
+        str: JSON文本
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+async def iter_sse_data(content: aiohttp.StreamReader, chunk_size: int = SSE_READ_SIZE) -> AsyncIterator[bytes]:
+    """
+    依次取出SSE响应流中数据行的内容。
+    
+    按块读入同一个缓冲区后再按换行切分，跳过空行和非数据行。
+    
+    Args:
+        content: 响应内容流
+        chunk_size: 每次读取的字节数
+        
+    Yields:
+        bytes: 去掉"data: "前缀和行尾空白后的数据
+    """
+    prefix_len = len(SSE_DATA_PREFIX)
+    buffer = bytearray()
+    async for block in content.iter_chunked(chunk_size):
+        buffer += block
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            if buffer.startswith(SSE_DATA_PREFIX, start, end):
+                yield bytes(buffer[start + prefix_len:end]).rstrip()
+            start = end + 1
+        del buffer[:start]
+    
+    # 最后一行可能没有换行符
+    if buffer.startswith(SSE_DATA_PREFIX):
+        yield bytes(buffer[prefix_len:]).rstrip()
+
+
+async def batch_stream(stream: AsyncIterator[str], max_delay: float, max_chars: int) -> AsyncIterator[str]:
+    """
+    合并流式片段后再输出，减少下游逐片段处理的次数。
+    
+    从缓冲第一个片段起，累积字符数达到max_chars或经过max_delay秒时输出一次；
+    等待下一个片段时不会超过当前的时间窗口。
+    
+    Args:
+        stream: 原始片段流
+        max_delay: 时间窗口（秒）
+        max_chars: 立即输出的字符数阈值
+        
+    Yields:
+        str: 合并后的片段
+    """
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    parts: List[str] = []
+    size = 0
+    deadline: Optional[float] = None
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if done:
+                task, pending = pending, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+                parts.append(chunk)
+                size += len(chunk)
+                if deadline is None:
+                    deadline = loop.time() + max_delay
+                if size < max_chars and loop.time() < deadline:
+                    continue
+            
+            # 达到字符数阈值或时间窗口已到
+            yield "".join(parts)
+            parts.clear()
+            size = 0
+            deadline = None
+        
+        if parts:
+            yield "".join(parts)
+    finally:
+        # 消费方提前停止或被取消时，结束未完成的读取并关闭原始片段流，释放其中的HTTP响应
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def batched_stream(func):
+    """
+    流式片段合并装饰器，用于提供商的stream_response方法。
+    
+    配置了大于0的stream_batch_ms时，按时间窗口和字符数合并片段后再输出；否则直接返回原始片段流。
+    
+    Args:
+        func: 被装饰的stream_response方法
+        
+    Returns:
+        包装后的方法
+    """
+    @functools.wraps(func)
+    def wrapper(self, prompt: str, conversation: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        stream = func(self, prompt, conversation)
+        batch_ms = self.config.get("stream_batch_ms", STREAM_BATCH_MS)
+        if batch_ms <= 0:
+            return stream
+        return batch_stream(
+            stream,
+            batch_ms / 1000,
+            self.config.get("stream_batch_chars", STREAM_BATCH_CHARS),
+        )
+    return wrapper
 
 
 class BaseProvider(ABC):
@@ -11,14 +251,26 @@ class BaseProvider(ABC):
     所有的AI提供商实现都需要继承这个基类，并实现其抽象方法。
     """
     
+    # 所有提供商共享的HTTP会话及其所属的事件循环
+    _session: Optional[aiohttp.ClientSession] = None
+    _session_loop: Optional[asyncio.AbstractEventLoop] = None
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
         """
         初始化AI提供商。
         
         Args:
-            config: 可选的配置字典，包含provider特定的配置项
+            config: 可选的配置字典，包含provider特定的配置项，
+                其中可选的system_prompt会作为固定的系统提示放在每次请求的最前面
         """
         self.config = config or {}
+        # 固定的系统提示前缀，创建后不再变化，以便服务端的前缀缓存命中
+        system_prompt = self.config.get("system_prompt")
+        self._system_messages: Tuple[Dict[str, str], ...] = (
+            ({"role": "system", "content": system_prompt},) if system_prompt else ()
+        )
+        # 请求体中固定字段的序列化结果，按字段取值缓存
+        self._body_prefixes: Dict[Tuple[Any, ...], bytes] = {}
 
     @abstractmethod
     async def generate_response(self, prompt: str, conversation: Optional[List[Dict]] = None) -> str:
@@ -62,6 +314,228 @@ class BaseProvider(ABC):
             bool: 配置有效返回True，否则返回False
         """
         return True
+    
+    def _build_messages(
+        self,
+        prompt: str,
+        conversation: Optional[List[Dict]] = None,
+        dynamic_context: Optional[str] = None
+    ) -> Tuple[Dict[str, str], ...]:
+        """
+        组装请求的消息序列。
+        
+        依次为固定的系统提示、历史对话、动态上下文和用户问题。服务端的提示缓存按前缀匹配，
+        因此每次请求都会变化的内容（如检索结果）应通过dynamic_context传入，
+        而不是拼接到系统提示中；系统提示在创建提供商后不应修改。
+        
+        Args:
+            prompt: 输入的问题或提示
+            conversation: 可选的历史对话记录
+            dynamic_context: 可选的动态上下文，作为系统消息放在用户问题之前
+            
+        Returns:
+            Tuple[Dict[str, str], ...]: 消息序列，一次性构建为元组，避免列表的复制和扩容
+        """
+        user_message = {"role": "user", "content": prompt}
+        if dynamic_context:
+            return (
+                *self._system_messages,
+                *(conversation or ()),
+                {"role": "system", "content": dynamic_context},
+                user_message,
+            )
+        return (*self._system_messages, *(conversation or ()), user_message)
+    
+    def _encode_request(self, messages: Sequence[Dict[str, str]], stream: bool) -> bytes:
+        """
+        序列化chat completions请求体。
+        
+        model、temperature、max_tokens和stream在请求之间通常不变，其序列化结果作为前缀缓存，
+        每次请求只序列化messages。
+        
+        Args:
+            messages: 消息序列
+            stream: 是否为流式请求
+            
+        Returns:
+            bytes: JSON格式的请求体
+        """
+        params = (self.config["model"], self.config["temperature"], self.config["max_tokens"], stream)
+        prefix = self._body_prefixes.get(params)
+        if prefix is None:
+            static = json_dumps(dict(zip(("model", "temperature", "max_tokens", "stream"), params)))
+            prefix = static[:-1] + b',"messages":'
+            self._body_prefixes[params] = prefix
+        return prefix + json_dumps(messages) + b"}"
+    
+    @classmethod
+    async def _get_session(cls) -> aiohttp.ClientSession:
+        """
+        获取所有提供商共享的HTTP会话。
+        
+        会话在首次使用时创建，之后的请求复用其中保持连接的TCP/TLS连接；
+        会话已关闭或当前事件循环与创建时不同时会重新创建。
+        
+        Returns:
+            aiohttp.ClientSession: 共享的HTTP会话
+        """
+        loop = asyncio.get_running_loop()
+        session = BaseProvider._session
+        if session is None or session.closed or BaseProvider._session_loop is not loop:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    resolver=aiohttp.AsyncResolver() if HAS_AIODNS else None,
+                    use_dns_cache=True,
+                    limit=HTTP_POOL_LIMIT,
+                    limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                ),
+                json_serialize=_serialize_json,
+            )
+            BaseProvider._session = session
+            BaseProvider._session_loop = loop
+        return session
+    
+    @classmethod
+    async def close_session(cls) -> None:
+        """关闭共享的HTTP会话，应在事件循环结束前调用。"""
+        session = BaseProvider._session
+        BaseProvider._session = None
+        BaseProvider._session_loop = None
+        if session is not None and not session.closed:
+            await session.close()
+
+
+class LLMCache:
+    """基于内存的LRU回答缓存，条目超过有效期后失效。"""
+    
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        """
+        初始化缓存。
+        
+        Args:
+            max_size: 最多缓存的条目数
+            ttl: 条目有效期（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        """
+        根据请求参数生成缓存键。
+        
+        Args:
+            **params: 决定回答内容的请求参数，如提供商、模型、消息列表等
+            
+        Returns:
+            str: 缓存键
+        """
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        获取缓存的回答。
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            Optional[str]: 缓存的回答，不存在或已过期时返回None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: str) -> None:
+        """
+        缓存回答，超过容量时淘汰最久未使用的条目。
+        
+        Args:
+            key: 缓存键
+            value: 回答内容
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def delete(self, key: str) -> None:
+        """
+        删除缓存的回答。
+        
+        Args:
+            key: 缓存键
+        """
+        self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """清空缓存。"""
+        self._entries.clear()
+
+
+# 所有提供商共享的回答缓存
+response_cache = LLMCache()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    规范化问题文本，用于生成缓存键。
+    
+    去掉首尾空白并将行内连续的空格和制表符合并为单个空格；换行和行首缩进会改变代码、
+    YAML或Markdown的含义，因此保持不变。
+    
+    Args:
+        prompt: 输入的问题或提示
+        
+    Returns:
+        str: 规范化后的文本
+    """
+    return _INLINE_SPACE_PATTERN.sub(" ", prompt.strip())
+
+
+def cached_response(func):
+    """
+    回答缓存装饰器，用于提供商的generate_response方法。
+    
+    仅在温度不高于CACHE_MAX_TEMPERATURE时使用缓存，此时相同请求的回答是确定的，
+    命中缓存可以省去一次完整的API调用。
+    
+    Args:
+        func: 被装饰的generate_response方法
+        
+    Returns:
+        包装后的方法
+    """
+    @functools.wraps(func)
+    async def wrapper(self, prompt: str, conversation: Optional[List[Dict]] = None) -> str:
+        if self.config.get("temperature", 1) > CACHE_MAX_TEMPERATURE:
+            return await func(self, prompt, conversation)
+        
+        key = LLMCache.make_key(
+            provider=getattr(self, "provider_name", type(self).__name__),
+            base_url=getattr(self, "base_url", None),
+            model=self.config.get("model"),
+            messages=self._build_messages(normalize_prompt(prompt), conversation),
+            temperature=self.config.get("temperature"),
+            max_tokens=self.config.get("max_tokens"),
+        )
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        response = await func(self, prompt, conversation)
+        response_cache.set(key, response)
+        return response
+    return wrapper
 
 
 class ProviderError(Exception):
@@ -75,6 +549,7 @@ class ProviderError(Exception):
             message: 错误信息
             provider_name: 发生错误的提供商名称
         """
+        self.message = message
         self.provider_name = provider_name
         super().__init__(f"[{provider_name}] {message}")
 
@@ -95,3 +570,194 @@ def register_provider(name: str):
         cls.provider_name = name
         return cls
     return decorator
+
+
+class OpenAICompatibleProvider(BaseProvider):
+    """兼容OpenAI chat completions接口的提供商基类。
+    
+    请求组装、共享HTTP会话、请求体序列化和SSE流解析都在这里实现，
+    子类只需声明接口地址、默认配置、参数范围和错误信息格式。
+    """
+    
+    # 接口的默认基础URL，可通过base_url配置项覆盖
+    default_base_url: str = ""
+    # 默认配置，未在配置字典中出现的项会被补上
+    default_config: Dict[str, Any] = {}
+    # 温度参数的上限
+    max_temperature: float = 2
+    # 是否校验stream配置项的类型
+    validate_stream: bool = True
+    # 接口返回非200状态码时的错误信息，可使用status和text两个字段
+    status_error_format: str = "API调用失败: {text}"
+    # 网络请求出错时错误信息的前缀
+    network_error_prefix: str = "网络请求失败"
+    # 流式片段无法解析时是否中止并抛出异常，否则跳过该片段
+    strict_stream_parsing: bool = False
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化提供商。
+        
+        Args:
+            config: 配置字典，必须包含：
+                - api_key: API密钥
+                可选包含：
+                - base_url: API基础URL
+                - model: 模型名称
+                - temperature: 温度参数
+                - max_tokens: 最大token数
+                
+        Raises:
+            ProviderError: 当未设置API密钥时抛出
+        """
+        super().__init__(config)
+        
+        if not self.config.get("api_key"):
+            raise ProviderError("未设置API密钥", self.provider_name)
+            
+        # 设置默认配置
+        for key, value in self.default_config.items():
+            self.config.setdefault(key, value)
+        
+        self.base_url = self.config.get("base_url", self.default_base_url)
+        self.api_url = f"{self.base_url}/chat/completions"
+        self.headers = {
+            "Authorization": f"Bearer {self.config['api_key']}",
+            "Content-Type": "application/json"
+        }
+    
+    @contextlib.asynccontextmanager
+    async def _post(self, messages: Sequence[Dict[str, str]], stream: bool) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        发送chat completions请求并检查状态码。
+        
+        Args:
+            messages: 消息序列
+            stream: 是否为流式请求
+            
+        Yields:
+            aiohttp.ClientResponse: 状态码为200的响应
+            
+        Raises:
+            ProviderError: 当接口返回非200状态码时抛出
+        """
+        session = await self._get_session()
+        async with session.post(
+            self.api_url,
+            headers=self.headers,
+            data=self._encode_request(messages, stream=stream)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise ProviderError(
+                    self.status_error_format.format(status=response.status, text=error_text),
+                    self.provider_name
+                )
+            yield response
+    
+    @cached_response
+    async def generate_response(self, prompt: str, conversation: Optional[List[Dict]] = None) -> str:
+        """
+        生成回答。
+        
+        Args:
+            prompt: 输入的问题或提示
+            conversation: 可选的历史对话记录
+            
+        Returns:
+            str: 生成的回答
+            
+        Raises:
+            ProviderError: 当调用API出错时抛出
+        """
+        messages = self._build_messages(prompt, conversation)
+        try:
+            async with self._post(messages, stream=False) as response:
+                result = await response.json(loads=json_loads)
+            return result["choices"][0]["message"]["content"]
+        except ProviderError:
+            raise
+        except aiohttp.ClientError as e:
+            raise ProviderError(f"{self.network_error_prefix}: {str(e)}", self.provider_name)
+        except Exception as e:
+            raise ProviderError(f"生成回答失败: {str(e)}", self.provider_name)
+    
+    @batched_stream
+    async def stream_response(self, prompt: str, conversation: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        """
+        流式生成回答。
+        
+        Args:
+            prompt: 输入的问题或提示
+            conversation: 可选的历史对话记录
+            
+        Yields:
+            str: 生成的部分回答
+            
+        Raises:
+            ProviderError: 当调用API出错时抛出
+        """
+        messages = self._build_messages(prompt, conversation)
+        try:
+            async with self._post(messages, stream=True) as response:
+                async for payload in iter_sse_data(response.content):
+                    if payload == SSE_DONE:
+                        break
+                    
+                    # 常见格式的片段直接取出内容，其余情况完整解析JSON
+                    content = extract_delta_content(payload)
+                    if content is None:
+                        try:
+                            # 只有role的首个片段等不含内容，取到None
+                            content = json_loads(payload)["choices"][0]["delta"].get("content")
+                        except (ValueError, LookupError, TypeError, AttributeError) as e:
+                            if self.strict_stream_parsing:
+                                raise ProviderError(f"解析响应失败: {str(e)}", self.provider_name)
+                            # JSON解码错误是ValueError的子类，默认日志级别下不产生任何输出
+                            logger.debug("解析响应片段失败: %s", e)
+                            continue
+                    if content:
+                        yield content
+        except ProviderError:
+            raise
+        except aiohttp.ClientError as e:
+            raise ProviderError(f"{self.network_error_prefix}: {str(e)}", self.provider_name)
+        except Exception as e:
+            raise ProviderError(f"流式生成失败: {str(e)}", self.provider_name)
+    
+    def validate_config(self) -> bool:
+        """
+        验证配置是否有效。
+        
+        Returns:
+            bool: 配置有效返回True，否则返回False
+        """
+        if "api_key" not in self.config:
+            return False
+            
+        if "temperature" in self.config:
+            if not isinstance(self.config["temperature"], (int, float)):
+                return False
+            if not 0 <= self.config["temperature"] <= self.max_temperature:
+                return False
+                
+        if "max_tokens" in self.config:
+            if not isinstance(self.config["max_tokens"], int):
+                return False
+            if self.config["max_tokens"] <= 0:
+                return False
+                
+        if self.validate_stream and "stream" in self.config:
+            if not isinstance(self.config["stream"], bool):
+                return False
+                
+        return True
+    
+    async def __aenter__(self):
+        """进入异步上下文。"""
+        await self._get_session()
+        return self
+        
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """退出异步上下文，关闭共享的HTTP会话。"""
+        await self.close_session()
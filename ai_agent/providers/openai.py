@@ -2,12 +2,57 @@
 OpenAI提供商实现。
 """
 import asyncio
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Set
 
 from openai import AsyncOpenAI, APIError
 import aiohttp
 
-from .base import BaseProvider, ProviderError, register_provider
+from .base import BaseProvider, ProviderError, batched_stream, cached_response, register_provider
+
+# 按API密钥复用的客户端数量上限，超出时关闭最久未使用的客户端及其HTTP连接池
+CLIENT_CACHE_SIZE = 16
+
+# 按API密钥复用的客户端，每个客户端持有自己的HTTP连接池
+_clients: "OrderedDict[str, AsyncOpenAI]" = OrderedDict()
+
+# 正在关闭的客户端任务，保留引用直到关闭完成
+_closing: Set["asyncio.Task[None]"] = set()
+
+def get_client(api_key: str) -> AsyncOpenAI:
+    """
+    获取指定API密钥的共享客户端，首次使用时创建。
+    
+    Args:
+        api_key: OpenAI API密钥
+        
+    Returns:
+        AsyncOpenAI: 客户端实例
+    """
+    client = _clients.get(api_key)
+    if client is not None:
+        _clients.move_to_end(api_key)
+        return client
+    
+    client = _clients[api_key] = AsyncOpenAI(api_key=api_key)
+    if len(_clients) > CLIENT_CACHE_SIZE:
+        _close_client(_clients.popitem(last=False)[1])
+    return client
+
+def _close_client(client: AsyncOpenAI) -> None:
+    """
+    关闭被淘汰的客户端，没有运行中的事件循环时交给垃圾回收。
+    
+    Args:
+        client: 要关闭的客户端
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(client.close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
 
 @register_provider("openai")
 class OpenAIProvider(BaseProvider):
@@ -36,10 +81,13 @@ class OpenAIProvider(BaseProvider):
         self.config.setdefault("temperature", 0.7)
         self.config.setdefault("max_tokens", 2000)
         self.config.setdefault("stream", True)
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """共享的API客户端，相同密钥的提供商复用连接池。"""
+        return get_client(self.config["api_key"])
         
-        # 初始化API客户端
-        self.client = AsyncOpenAI(api_key=self.config["api_key"])
-        
+    @cached_response
     async def generate_response(self, prompt: str, conversation: Optional[List[Dict]] = None) -> str:
         """
         生成回答。
@@ -55,13 +103,7 @@ class OpenAIProvider(BaseProvider):
             ProviderError: 当调用API出错时抛出
         """
         try:
-            messages = []
-            if conversation:
-                messages.extend(conversation)
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            messages = self._build_messages(prompt, conversation)
             
             response = await self.client.chat.completions.create(
                 model=self.config["model"],
@@ -78,6 +120,7 @@ class OpenAIProvider(BaseProvider):
         except Exception as e:
             raise ProviderError(f"生成回答失败: {str(e)}", "openai")
             
+    @batched_stream
     async def stream_response(self, prompt: str, conversation: Optional[List[Dict]] = None) -> AsyncGenerator[str, None]:
         """
         流式生成回答。
@@ -93,13 +136,7 @@ class OpenAIProvider(BaseProvider):
             ProviderError: 当调用API出错时抛出
         """
         try:
-            messages = []
-            if conversation:
-                messages.extend(conversation)
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            messages = self._build_messages(prompt, conversation)
             
             stream = await self.client.chat.completions.create(
                 model=self.config["model"],
@@ -171,16 +208,29 @@ async def test_api_key(api_key: str) -> bool:
     Returns:
         bool: 密钥有效返回True，否则返回False
     """
-    client = AsyncOpenAI(api_key=api_key)
+    # 批量检查的密钥大多只用一次，使用独立的客户端并在检查后关闭，不放入共享缓存
     try:
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{
-                "role": "user",
-                "content": "Hello"
-            }],
-            max_tokens=5
-        )
+        async with AsyncOpenAI(api_key=api_key) as client:
+            response = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{
+                    "role": "user",
+                    "content": "Hello"
+                }],
+                max_tokens=5
+            )
         return True
     except Exception:
         return False
+
+async def test_api_keys(api_keys: Iterable[str]) -> List[bool]:
+    """
+    并发测试多个API密钥是否有效，每个密钥使用检查后即关闭的独立客户端。
+    
+    Args:
+        api_keys: 要测试的API密钥
+        
+    Returns:
+        List[bool]: 与输入顺序对应的测试结果
+    """
+    return list(await asyncio.gather(*(test_api_key(api_key) for api_key in api_keys)))
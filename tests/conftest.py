@@ -0,0 +1,88 @@
+"""
+测试公共fixture。
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from ai_agent.providers.base import BaseProvider
+
+class MockContent:
+    """模拟响应的content，与aiohttp一样按指定大小切分响应体后产出。"""
+    
+    def __init__(self, chunks):
+        # 一次性拼接全部数据行，读取时只做切片
+        self.body = b"".join(chunks)
+        
+    async def iter_chunked(self, size):
+        body = self.body
+        for start in range(0, len(body), size):
+            yield body[start:start + size]
+
+class AsyncCtx:
+    """只返回固定响应的异步上下文管理器，模拟session.post()的返回值。"""
+    
+    __slots__ = ("response",)
+    
+    def __init__(self, response):
+        self.response = response
+        
+    async def __aenter__(self):
+        return self.response
+        
+    async def __aexit__(self, *exc_info):
+        return False
+
+def areturn(value):
+    """创建总是返回value的协程函数，用于只需固定返回值的异步方法。"""
+    async def coroutine(*args, **kwargs):
+        return value
+    return coroutine
+
+async def acollect(aiterable):
+    """将异步可迭代对象的全部元素收集为列表。"""
+    return [item async for item in aiterable]
+
+def make_mock_response(chunks=(), status=200):
+    """
+    创建模拟的流式响应。
+    
+    Args:
+        chunks: content按顺序产出的字节块
+        status: HTTP状态码
+        
+    Returns:
+        SimpleNamespace: 模拟的响应对象
+    """
+    return SimpleNamespace(
+        status=status,
+        content=MockContent(chunks),
+        text=areturn("Success"),
+    )
+
+@pytest_asyncio.fixture(autouse=True)
+async def close_shared_session():
+    """每个测试结束后关闭提供商共享的HTTP会话。"""
+    yield
+    await BaseProvider.close_session()
+
+@pytest.fixture(scope="module")
+def _post_patcher():
+    """同一测试模块内共用一个aiohttp.ClientSession.post补丁。"""
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        yield mock_post
+
+@pytest.fixture
+def patched_post(_post_patcher):
+    """返回共享的post模拟对象，并清除上一个测试留下的返回值和调用记录。"""
+    _post_patcher.reset_mock(return_value=True, side_effect=True)
+    return _post_patcher
+
+@pytest.fixture
+def post_mock(patched_post):
+    """返回设置模拟响应的函数，之后的post请求都会得到该响应。"""
+    def set_response(response):
+        patched_post.return_value = AsyncCtx(response)
+    return set_response
@@ -137,6 +137,90 @@ async def test_agent_stream_with_plugin(mock_provider, mock_plugin, mock_output)
     assert result == "Hello World"  # 完整输出（插件后处理前）
     assert mock_output.stream_output == ["Hello ", "World"]  # 流式输出记录
 
+@pytest.mark.asyncio
+async def test_agent_stream_multiple_outputs(mock_provider):
+    """测试流式处理时每个输出处理器都收到完整的流。"""
+    first = MockOutput()
+    second = MockOutput()
+    agent = Agent(mock_provider, config={"output": ["first", "second"]})
+    agent.add_output(first, "first", default=True)
+    agent.add_output(second, "second")
+    
+    result = await agent.process_stream("Test input")
+    assert result == "Hello World"
+    assert first.stream_output == ["Hello ", "World"]
+    assert second.stream_output == ["Hello ", "World"]
+
+@pytest.mark.asyncio
+async def test_agent_render_failure_cancels_other_outputs(mock_provider):
+    """测试某个输出处理器渲染失败时取消其余的渲染任务。"""
+    class SlowOutput(MockOutput):
+        cancelled = False
+        
+        async def render(self, content: str) -> None:
+            if content.startswith("处理失败"):
+                return await super().render(content)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+    
+    class FailingOutput(MockOutput):
+        async def render(self, content: str) -> None:
+            raise RuntimeError("render error")
+    
+    slow = SlowOutput()
+    agent = Agent(mock_provider, config={"output": ["slow", "failing"]})
+    agent.add_output(slow, "slow", default=True)
+    agent.add_output(FailingOutput(), "failing")
+    
+    with pytest.raises(RuntimeError):
+        await agent.process("Test input")
+    await asyncio.sleep(0)
+    assert slow.cancelled
+    assert slow.last_output == "处理失败: render error"
+
+@pytest.mark.asyncio
+async def test_chunk_to_stream(mock_provider):
+    """测试文本按空格和标点切分为流。"""
+    agent = Agent(mock_provider)
+    chunks = [chunk async for chunk in agent._chunk_to_stream("Hi there. OK!\nend")]
+    assert chunks == ["Hi ", "there.", " ", "OK!", "\n", "end"]
+    assert [chunk async for chunk in agent._chunk_to_stream("")] == []
+
+@pytest.mark.asyncio
+async def test_agent_outputs_cache(mock_provider):
+    """测试默认输出处理器缓存在输出处理器变更后失效。"""
+    first = MockOutput()
+    second = MockOutput()
+    agent = Agent(mock_provider)
+    agent.add_output(first, "first", default=True)
+    
+    await agent.process("Test input")
+    assert first.last_output == "Hello, World!"
+    
+    # 切换默认输出处理器后使用新的输出
+    agent.add_output(second, "second", default=True)
+    await agent.process("Test input")
+    assert second.last_output == "Hello, World!"
+
+@pytest.mark.asyncio
+async def test_agent_stream_post_process_unsafe_plugin(mock_provider, mock_output):
+    """测试非流式安全的插件在流式处理后对完整文本执行后处理。"""
+    class FullTextPlugin(MockPlugin):
+        streaming_safe = False
+    
+    agent = Agent(mock_provider)
+    agent.add_plugin(FullTextPlugin())
+    agent.add_output(mock_output, default=True)
+    
+    result = await agent.process_stream("Test input")
+    
+    assert result == "[Post] Hello World"
+    assert agent.conversation[-1]["content"] == "[Post] Hello World"
+    assert mock_output.stream_output == ["Hello ", "World"]
+
 def test_agent_builder():
     """测试代理构建器。"""
     provider = MockProvider()
@@ -169,6 +253,27 @@ def test_agent_builder():
     agent = builder.build()
     assert agent.config["test_key"] == "test_value"
 
+@pytest.mark.asyncio
+async def test_agent_history_trimming(mock_provider, mock_output):
+    """测试对话历史超过上限时较早的消息被压缩为总结。"""
+    agent = Agent(mock_provider, config={"max_history_turns": 1})
+    agent.add_output(mock_output, default=True)
+    
+    await agent.process("First")
+    assert len(agent.conversation) == 2
+    
+    await agent.process("Second")
+    assert agent.conversation == [
+        {"role": "system", "content": "Hello, World!"},
+        {"role": "user", "content": "Second"},
+        {"role": "assistant", "content": "Hello, World!"},
+    ]
+    
+    await agent.process_stream("Third")
+    assert len(agent.conversation) == 3
+    assert agent.conversation[0]["role"] == "system"
+    assert agent.conversation[1] == {"role": "user", "content": "Third"}
+
 @pytest.mark.asyncio
 async def test_generate_summary(mock_provider, mock_output):
     """测试对话总结生成功能。"""
@@ -187,6 +292,27 @@ async def test_generate_summary(mock_provider, mock_output):
     # 确保总结生成时使用了对话历史
     assert mock_provider.last_conversation == agent.conversation
 
+def test_save_conversation(mock_provider, tmp_path):
+    """测试对话保存为Markdown文件。"""
+    save_dir = tmp_path / "ai-agent" / "conversations"
+    agent = Agent(mock_provider, config={"save_dir": str(save_dir)})
+    
+    # 空对话不保存
+    assert agent._save_conversation() is None
+    
+    agent.summary = "测试"
+    agent.conversation = [
+        {"role": "user", "content": "你好"},
+        {"role": "assistant", "content": "你好！"}
+    ]
+    save_path = agent._save_conversation()
+    assert save_path.startswith(str(save_dir))
+    
+    with open(save_path, encoding="utf-8") as f:
+        content = f.read()
+    assert content.startswith("# 测试\n开始时间：")
+    assert content.endswith("## 对话内容\n\n**用户**: 你好\n\n**助手**: 你好！\n")
+
 @pytest.mark.asyncio
 async def test_agent_error_handling(mock_output):
     """测试代理的错误处理。"""
@@ -208,18 +334,22 @@ async def test_agent_error_handling(mock_output):
     with pytest.raises(Exception):
         await agent.process_stream("Test input")
 
+class HighPriorityPlugin(MockPlugin):
+    """高优先级测试插件。"""
+    
+    @property
+    def priority(self) -> int:
+        return 0
+        
+class LowPriorityPlugin(MockPlugin):
+    """低优先级测试插件。"""
+    
+    @property
+    def priority(self) -> int:
+        return 100
+
 def test_agent_plugin_priority():
     """测试代理的插件优先级处理。"""
-    class HighPriorityPlugin(MockPlugin):
-        @property
-        def priority(self) -> int:
-            return 0
-            
-    class LowPriorityPlugin(MockPlugin):
-        @property
-        def priority(self) -> int:
-            return 100
-    
     agent = Agent(MockProvider())
     high = HighPriorityPlugin()
     low = LowPriorityPlugin()
@@ -231,5 +361,51 @@ def test_agent_plugin_priority():
     assert plugins[0] is high
     assert plugins[1] is low
 
+def test_agent_plugin_failure_continues():
+    """测试某个插件失败时其余插件继续处理。"""
+    class FailingPlugin(BasePlugin):
+        @property
+        def priority(self) -> int:
+            return 50
+            
+        def pre_process(self, input_text: str) -> str:
+            raise RuntimeError("boom")
+    
+    class FirstPlugin(MockPlugin):
+        @property
+        def priority(self) -> int:
+            return 0
+    
+    agent = Agent(MockProvider())
+    agent.add_plugin(FirstPlugin())
+    agent.add_plugin(FailingPlugin())
+    agent.add_plugin(MockPlugin())
+    
+    assert agent._apply_pre_process("Hi") == "[Pre] [Pre] Hi"
+    assert agent._apply_post_process("Hi") == "[Post] [Post] Hi"
+
+def test_agent_sorted_plugins_cache():
+    """测试插件排序缓存在插件变更后失效。"""
+    class AnotherPlugin(MockPlugin):
+        @property
+        def priority(self) -> int:
+            return 0
+    
+    agent = Agent(MockProvider())
+    first = MockPlugin()
+    agent.add_plugin(first)
+    
+    plugins = agent._get_sorted_plugins()
+    assert plugins == (first,)
+    assert agent._get_sorted_plugins() is plugins  # 命中缓存
+    
+    # 直接通过插件管理器注册也会使缓存失效
+    second = AnotherPlugin()
+    agent.plugin_manager.register("another", second)
+    assert agent._get_sorted_plugins() == (second, first)
+    
+    agent.plugin_manager.unregister("another")
+    assert agent._get_sorted_plugins() == (first,)
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -12,9 +12,35 @@ import pytest
 from ai_agent.providers.ark import ArkProvider
 from ai_agent.providers.base import ProviderError
 
-@pytest.fixture
+from .conftest import MockContent
+
+# 模拟的非流式响应内容，测试只读不改
+TEST_RESPONSE = {
+    "choices": [{
+        "message": {
+            "content": "test response"
+        }
+    }]
+}
+
+# 模拟流式响应的内容
+STREAM_CHUNKS = (
+    b'data: {"choices":[{"delta":{"content":"test"}}]}\n',
+    b'data: {"choices":[{"delta":{"content":"response"}}]}\n',
+    b'data: [DONE]\n',
+)
+
+# 模拟包含无效JSON的流式响应
+INVALID_JSON_STREAM_CHUNKS = (
+    b'data: {"choices":[{"delta":{"content":"test"}}]}\n',
+    b'data: invalid-json\n',
+    b'data: {"choices":[{"delta":{"content":"response"}}]}\n',
+    b'data: [DONE]\n',
+)
+
+@pytest.fixture(scope="session")
 def provider():
-    """创建一个测试用的provider实例。"""
+    """创建一个测试用的provider实例，所有测试共享且不修改其状态。"""
     return ArkProvider({
         "api_key": "test-key",
         "model": "test-model",
@@ -24,12 +50,12 @@ def provider():
 
 @pytest.fixture
 def mock_response():
-    """模拟API响应。"""
+    """模拟API响应，测试会设置其json和content，因此每个测试单独创建。"""
     mock = MagicMock()
     mock.status = 200
     return mock
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def error_response():
     """模拟错误响应。"""
     mock = MagicMock()
@@ -53,7 +79,7 @@ def test_init_without_api_key():
     """测试没有API密钥时的初始化。"""
     with pytest.raises(ProviderError) as exc_info:
         ArkProvider({})
-    assert "未设置API密钥" in str(exc_info.value)
+    assert exc_info.value.message == "未设置API密钥"
 
 def test_validate_config_with_valid_config():
     """测试有效配置的验证。"""
@@ -83,14 +109,7 @@ def test_validate_config_with_invalid_max_tokens():
 @pytest.mark.asyncio
 async def test_generate_response_success(provider, mock_response):
     """测试成功生成响应。"""
-    test_response = {
-        "choices": [{
-            "message": {
-                "content": "test response"
-            }
-        }]
-    }
-    mock_response.json = AsyncMock(return_value=test_response)
+    mock_response.json = AsyncMock(return_value=TEST_RESPONSE)
     
     with patch("aiohttp.ClientSession.post") as mock_post:
         mock_post.return_value.__aenter__.return_value = mock_response
@@ -106,7 +125,7 @@ async def test_generate_response_api_error(provider, error_response):
         with pytest.raises(ProviderError) as exc_info:
             await provider.generate_response("test prompt")
             
-    assert "API调用失败" in str(exc_info.value)
+    assert exc_info.value.message == "API调用失败: API错误"
 
 @pytest.mark.asyncio
 async def test_generate_response_network_error(provider):
@@ -116,19 +135,12 @@ async def test_generate_response_network_error(provider):
         with pytest.raises(ProviderError) as exc_info:
             await provider.generate_response("test prompt")
             
-    assert "网络请求失败" in str(exc_info.value)
+    assert exc_info.value.message.startswith("网络请求失败")
 
 @pytest.mark.asyncio
 async def test_stream_response_success(provider, mock_response):
     """测试成功的流式响应。"""
-    # 模拟流式响应的内容
-    chunks = [
-        b'data: {"choices":[{"delta":{"content":"test"}}]}\n',
-        b'data: {"choices":[{"delta":{"content":"response"}}]}\n',
-        b'data: [DONE]\n'
-    ]
-    mock_response.content = AsyncMock()
-    mock_response.content.__aiter__.return_value = [chunk for chunk in chunks]
+    mock_response.content = MockContent(STREAM_CHUNKS)
     
     with patch("aiohttp.ClientSession.post") as mock_post:
         mock_post.return_value.__aenter__.return_value = mock_response
@@ -147,7 +159,7 @@ async def test_stream_response_api_error(provider, error_response):
             async for _ in provider.stream_response("test prompt"):
                 pass
                 
-    assert "API调用失败" in str(exc_info.value)
+    assert exc_info.value.message == "API调用失败: API错误"
 
 @pytest.mark.asyncio
 async def test_stream_response_network_error(provider):
@@ -158,20 +170,12 @@ async def test_stream_response_network_error(provider):
             async for _ in provider.stream_response("test prompt"):
                 pass
                 
-    assert "网络请求失败" in str(exc_info.value)
+    assert exc_info.value.message.startswith("网络请求失败")
 
 @pytest.mark.asyncio
 async def test_stream_response_invalid_json(provider, mock_response):
     """测试流式响应中的无效JSON处理。"""
-    # 模拟包含无效JSON的响应
-    chunks = [
-        b'data: {"choices":[{"delta":{"content":"test"}}]}\n',
-        b'data: invalid-json\n',
-        b'data: {"choices":[{"delta":{"content":"response"}}]}\n',
-        b'data: [DONE]\n'
-    ]
-    mock_response.content = AsyncMock()
-    mock_response.content.__aiter__.return_value = [chunk for chunk in chunks]
+    mock_response.content = MockContent(INVALID_JSON_STREAM_CHUNKS)
     
     with patch("aiohttp.ClientSession.post") as mock_post:
         mock_post.return_value.__aenter__.return_value = mock_response
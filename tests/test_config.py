@@ -3,6 +3,8 @@
 """
 import os
 import pytest
+from unittest.mock import patch
+
 from ai_agent.core.config import Config, ConfigManager
 
 def test_config_defaults():
@@ -27,23 +29,41 @@ def test_config_custom_values():
     assert config.model == "gpt-4"
     assert config.temperature == 0.5
 
-def test_config_manager_env_vars(monkeypatch):
+def test_config_manager_env_vars():
     """测试从环境变量加载配置。"""
-    # 设置测试环境变量
-    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
-    monkeypatch.setenv("AI_AGENT_PROVIDER", "custom")
-    monkeypatch.setenv("AI_AGENT_MODEL", "gpt-4")
-    monkeypatch.setenv("AI_AGENT_PLUGINS", "plugin1,plugin2")
-    
-    # 创建新的配置管理器并加载配置
-    manager = ConfigManager()
-    manager.load_config()
+    # 一次性设置测试环境变量，退出时整体恢复
+    test_env = {
+        "OPENAI_API_KEY": "test-key",
+        "AI_AGENT_PROVIDER": "custom",
+        "AI_AGENT_MODEL": "gpt-4",
+        "AI_AGENT_PLUGINS": "plugin1,plugin2",
+    }
+    with patch.dict(os.environ, test_env):
+        # 创建新的配置管理器并加载配置
+        manager = ConfigManager()
+        manager.load_config()
     
     assert manager.config.api_key == "test-key"
     assert manager.config.provider == "custom"
     assert manager.config.model == "gpt-4"
     assert manager.config.plugins == ["plugin1", "plugin2"]
 
+def test_config_manager_env_var_conversion(monkeypatch):
+    """测试环境变量的类型转换。"""
+    monkeypatch.setenv("AI_AGENT_TEMPERATURE", "0.3")
+    monkeypatch.setenv("AI_AGENT_MAX_TOKENS", "not_a_number")
+    monkeypatch.setenv("AI_AGENT_STREAM", "no")
+    
+    manager = ConfigManager()
+    manager.config.api_key = "existing-key"
+    monkeypatch.setenv("OPENAI_API_KEY", "env-key")
+    manager._load_env_vars()
+    
+    assert manager.config.temperature == 0.3
+    assert manager.config.max_tokens == 2000  # 无效值被忽略
+    assert manager.config.stream is False
+    assert manager.config.api_key == "existing-key"  # 已设置的密钥不被覆盖
+
 def test_provider_config():
     """测试获取提供商配置。"""
     manager = ConfigManager()
@@ -80,5 +100,26 @@ def test_config_save_load(tmp_path):
     assert new_manager.config.provider == "custom"
     assert new_manager.config.model == "gpt-4"
 
+def test_config_file_cache(tmp_path):
+    """测试配置文件解析结果的缓存与失效。"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text('model = "gpt-4"\nplugins = ["translator"]\n', encoding="utf-8")
+    
+    manager = ConfigManager()
+    manager.load_config(str(config_path))
+    assert manager.config.model == "gpt-4"
+    
+    # 修改加载后的配置不影响缓存
+    manager.config.plugins.append("other")
+    second = ConfigManager()
+    second.load_config(str(config_path))
+    assert second.config.plugins == ["translator"]
+    
+    # 文件变化后重新解析
+    config_path.write_text('model = "gpt-3.5-turbo-16k"\n', encoding="utf-8")
+    third = ConfigManager()
+    third.load_config(str(config_path))
+    assert third.config.model == "gpt-3.5-turbo-16k"
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,7 +1,6 @@
 """
 输出处理模块的单元测试。
 """
-import asyncio
 import pytest
 from io import StringIO
 from typing import AsyncGenerator
@@ -28,11 +27,13 @@ class TestOutput(BaseOutput):
     def get_output(self) -> str:
         return self.output.getvalue()
 
+# 模拟内容流产出的文本片段
+STREAM_CHUNKS = ("Hello", ", ", "World", "!")
+
 async def mock_stream() -> AsyncGenerator[str, None]:
     """模拟内容流。"""
-    for text in ["Hello", ", ", "World", "!"]:
+    for text in STREAM_CHUNKS:
         yield text
-        await asyncio.sleep(0.01)
 
 def test_output_registration():
     """测试输出处理器注册。"""
@@ -98,6 +99,22 @@ async def test_output_rendering():
     await output.render_stream(mock_stream())
     assert output.get_output() == "Hello, World!"
 
+@pytest.mark.asyncio
+async def test_terminal_stream_flushes_on_sentence_break():
+    """测试流式输出遇到断句符号时立即输出，不等待下一个片段。"""
+    file = StringIO()
+    output = TerminalOutput({"file": file, "color_system": None})
+    flushed = []
+    
+    async def stream():
+        yield "Hi."
+        flushed.append(file.getvalue())
+        yield "Bye"
+    
+    await output.render_stream(stream())
+    assert flushed == ["Hi."]
+    assert file.getvalue() == "Hi.Bye\n"
+
 def test_terminal_output():
     """测试终端输出处理器。"""
     output = TerminalOutput()
@@ -127,6 +144,30 @@ def test_terminal_output():
         output.config = config  # 直接设置config以避免Console初始化错误
         assert not output.validate_config(), f"无效配置应该使validate_config返回False: {config}"
 
+def test_terminal_markdown_detection():
+    """测试终端输出处理器的Markdown检测。"""
+    output = TerminalOutput()
+    
+    for content in ["## 标题", "**粗体**", "`code`", "> 引用", "- 列表", "[链接](url)", "![图片](url)"]:
+        assert output._is_markdown(content), f"应识别为Markdown: {content}"
+    
+    for content in ["普通文本", "# 单个井号", "Hello, World!"]:
+        assert not output._is_markdown(content), f"不应识别为Markdown: {content}"
+
+def test_terminal_split_code_blocks():
+    """测试终端输出处理器的代码块切分。"""
+    output = TerminalOutput()
+    
+    content = "intro\n```python\nprint(1)\n```\noutro"
+    assert output._split_code_blocks(content) == ["intro", "```python\nprint(1)\n```", "outro"]
+    
+    # 未闭合的代码块按普通文本处理
+    assert output._split_code_blocks("text\n```\ncode") == ["text", "```\ncode"]
+    
+    # 闭合围栏后同一行的文本按普通文本保留
+    content = "a\n```py\nx\n``` see above\nb"
+    assert output._split_code_blocks(content) == ["a", "```py\nx\n```", " see above\nb"]
+
 def test_output_error():
     """测试输出错误处理。"""
     error = OutputError("Test error", "test_output")
@@ -2,7 +2,8 @@
 插件系统的单元测试。
 """
 import pytest
-from ai_agent.plugins import BasePlugin, PluginManager, PluginError, register_plugin
+from ai_agent.plugins import BasePlugin, PluginManager, PluginError, register_plugin, load_plugin_class
+from ai_agent.plugins.translator import Plugin as TranslatorPlugin
 
 # 创建测试用插件
 @register_plugin("test")
@@ -54,20 +55,24 @@ def test_plugin_processing():
     processed = plugin.post_process(output_text)
     assert processed == "[Post-processed] World"
 
+@register_plugin("high_priority")
+class HighPriorityPlugin(BasePlugin):
+    """高优先级测试插件。"""
+    
+    @property
+    def priority(self) -> int:
+        return 0
+        
+@register_plugin("low_priority")
+class LowPriorityPlugin(BasePlugin):
+    """低优先级测试插件。"""
+    
+    @property
+    def priority(self) -> int:
+        return 100
+
 def test_plugin_priority():
     """测试插件优先级。"""
-    @register_plugin("high_priority")
-    class HighPriorityPlugin(BasePlugin):
-        @property
-        def priority(self) -> int:
-            return 0
-            
-    @register_plugin("low_priority")
-    class LowPriorityPlugin(BasePlugin):
-        @property
-        def priority(self) -> int:
-            return 100
-    
     manager = PluginManager()
     high = HighPriorityPlugin()
     low = LowPriorityPlugin()
@@ -80,6 +85,12 @@ def test_plugin_priority():
     
     assert sorted_plugins[0] is high
     assert sorted_plugins[1] is low
+    
+    # 插件管理器维护排序后的元组，变更前返回同一对象
+    assert manager.sorted_plugins() == (high, low)
+    assert manager.sorted_plugins() is manager.sorted_plugins()
+    manager.unregister("high")
+    assert manager.sorted_plugins() == (low,)
 
 def test_plugin_config():
     """测试插件配置。"""
@@ -123,5 +134,13 @@ def test_register_plugin_decorator():
     assert hasattr(ValidPlugin, "plugin_name")
     assert ValidPlugin.plugin_name == "valid"
 
+def test_load_plugin_class():
+    """测试按名称加载插件类。"""
+    assert load_plugin_class("translator") is TranslatorPlugin
+    
+    # 测试加载不存在的插件
+    with pytest.raises(ImportError):
+        load_plugin_class("nonexistent")
+
 if __name__ == "__main__":
     pytest.main([__file__])
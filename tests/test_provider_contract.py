@@ -0,0 +1,101 @@
+"""
+OpenAI兼容Provider的公共行为测试。
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from ai_agent.providers.base import ProviderError
+from ai_agent.providers.deepseek import DeepSeekProvider
+from ai_agent.providers.sustech import SustechProvider
+
+from .conftest import acollect, areturn, make_mock_response
+
+# 模拟流式响应的内容
+STREAM_CHUNKS = (
+    b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n',
+    b'data: {"choices":[{"delta":{"content":" World"}}]}\n',
+    b'data: [DONE]\n',
+)
+
+# 模拟的非流式响应内容
+MOCK_RESPONSE = {
+    "choices": [{
+        "message": {
+            "content": "Hello!"
+        }
+    }]
+}
+
+# 历史对话
+CONVERSATION = [
+    {"role": "user", "content": "Hi there"},
+    {"role": "assistant", "content": "Hello! How can I help?"}
+]
+
+@pytest.fixture(scope="session", params=[
+    pytest.param((DeepSeekProvider, {
+        "api_key": "test_key",
+        "model": "deepseek-chat",
+        "temperature": 0.7,
+        "max_tokens": 100
+    }, "API调用失败: API Error"), id="deepseek"),
+    pytest.param((SustechProvider, {
+        "api_key": "test_key",
+        "model": "deepseek-r1-250120",
+        "temperature": 0.7,
+        "max_tokens": 100,
+        "base_url": "https://chat.sustech.edu.cn/api"
+    }, "API请求失败: HTTP 400 - API Error"), id="sustech"),
+])
+def provider_case(request):
+    """(provider实例, 接口返回400时的错误信息) fixture"""
+    provider_cls, config, error_message = request.param
+    return provider_cls(dict(config)), error_message
+
+@pytest.mark.parametrize("provider_cls", [DeepSeekProvider, SustechProvider])
+def test_init_no_api_key(provider_cls):
+    """测试没有API密钥时初始化失败"""
+    with pytest.raises(ProviderError) as exc_info:
+        provider_cls({})
+    assert exc_info.value.message == "未设置API密钥"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("conversation", [None, CONVERSATION], ids=["no_history", "history"])
+async def test_generate_response(provider_case, post_mock, conversation):
+    """测试生成回答"""
+    provider, _ = provider_case
+    post_mock(SimpleNamespace(status=200, json=areturn(MOCK_RESPONSE)))
+
+    response = await provider.generate_response("Hi", conversation)
+    assert response == "Hello!"
+
+@pytest.mark.asyncio
+async def test_generate_response_api_error(provider_case, post_mock):
+    """测试API错误时生成回答失败"""
+    provider, error_message = provider_case
+    post_mock(SimpleNamespace(status=400, text=areturn("API Error")))
+
+    with pytest.raises(ProviderError) as exc_info:
+        await provider.generate_response("Hi")
+    assert exc_info.value.message == error_message
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("conversation", [None, CONVERSATION], ids=["no_history", "history"])
+async def test_stream_response(provider_case, post_mock, conversation):
+    """测试流式生成回答"""
+    provider, _ = provider_case
+    post_mock(make_mock_response(STREAM_CHUNKS))
+
+    chunks = await acollect(provider.stream_response("Hi", conversation))
+    assert chunks == ["Hello", " World"]
+
+@pytest.mark.asyncio
+async def test_stream_response_api_error(provider_case, post_mock):
+    """测试API错误时流式生成失败"""
+    provider, error_message = provider_case
+    post_mock(SimpleNamespace(status=400, text=areturn("API Error")))
+
+    with pytest.raises(ProviderError) as exc_info:
+        await acollect(provider.stream_response("Hi"))
+    assert exc_info.value.message == error_message
@@ -1,13 +1,30 @@
 """
 Provider相关测试。
 """
-import pytest
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from ai_agent.providers.deepseek import DeepSeekProvider, test_api_key
-from ai_agent.providers.base import ProviderError
+import pytest
+
+from ai_agent.providers import openai as openai_provider
+from ai_agent.providers.deepseek import DeepSeekProvider
+from ai_agent.providers.openai import OpenAIProvider
+from ai_agent.providers.base import (
+    BaseProvider,
+    LLMCache,
+    batch_stream,
+    extract_delta_content,
+    iter_sse_data,
+    json_dumps,
+    json_loads,
+    response_cache,
+)
 
-@pytest.fixture
+from .conftest import MockContent, acollect, areturn, make_mock_response
+
+@pytest.fixture(scope="session")
 def deepseek_config():
     """DeepSeek provider配置fixture"""
     return {
@@ -17,180 +34,323 @@ def deepseek_config():
         "max_tokens": 100
     }
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def deepseek_provider(deepseek_config):
     """DeepSeek provider实例fixture"""
-    return DeepSeekProvider(deepseek_config)
+    return DeepSeekProvider(dict(deepseek_config))
 
-@pytest.mark.asyncio
-async def test_deepseek_init(deepseek_config):
+def test_deepseek_init(deepseek_config):
     """测试DeepSeek provider初始化"""
-    provider = DeepSeekProvider(deepseek_config)
+    provider = DeepSeekProvider(dict(deepseek_config))
     assert provider.config["api_key"] == "test_key"
     assert provider.config["model"] == "deepseek-chat"
     assert provider.config["temperature"] == 0.7
     assert provider.config["max_tokens"] == 100
 
 @pytest.mark.asyncio
-async def test_deepseek_init_no_api_key():
-    """测试没有API密钥时初始化失败"""
-    with pytest.raises(ProviderError) as exc_info:
-        DeepSeekProvider({})
-    assert "未设置API密钥" in str(exc_info.value)
+async def test_stream_response_skips_malformed_chunk(deepseek_provider, post_mock, caplog, capsys):
+    """测试无效的响应片段被跳过，只记录调试日志而不打印"""
+    mock_chunks = [
+        b'data: {"choices":[{"delta":\n',
+        b'data: {"choices":[{"delta":{"content":" World"}}]}\n',
+        b'data: [DONE]\n'
+    ]
+
+    post_mock(make_mock_response(mock_chunks))
+
+    with caplog.at_level("DEBUG", logger="ai_agent.providers.base"):
+        chunks = await acollect(deepseek_provider.stream_response("Hi"))
+    assert chunks == [" World"]
+    assert "解析响应片段失败" in caplog.text
+    assert capsys.readouterr().out == ""
 
 @pytest.mark.asyncio
-async def test_generate_response(deepseek_provider):
-    """测试生成回答"""
-    mock_response = {
-        "choices": [{
-            "message": {
-                "content": "Hello!"
-            }
-        }]
-    }
+async def test_stream_response_fallback_parse(deepseek_provider, post_mock):
+    """测试无法快速提取内容的片段回退到完整解析，不含内容的片段被跳过"""
+    mock_chunks = [
+        b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n',
+        b'data: {"choices":[]}\n',
+        b'data: {"choices":[{"delta":{"content":"say \\"hi\\""}}]}\n',
+        b'data: {"choices":[{"delta":{"content":null}}]}\n',
+        b'data: [DONE]\n'
+    ]
+
+    post_mock(make_mock_response(mock_chunks))
+
+    chunks = await acollect(deepseek_provider.stream_response("Hi"))
+    assert chunks == ['say "hi"']
+
+def test_validate_config(deepseek_provider):
+    """测试配置验证"""
+    assert deepseek_provider.validate_config() is True
+
+@pytest.mark.parametrize("config", [
+    {"api_key": "test", "temperature": 2.0},  # temperature超出范围
+    {"api_key": "test", "temperature": "0.7"},  # temperature类型错误
+    {"api_key": "test", "max_tokens": 0},  # max_tokens无效
+    {"api_key": "test", "max_tokens": "100"},  # max_tokens类型错误
+    {"api_key": "test", "stream": "true"},  # stream类型错误
+])
+def test_validate_config_invalid(config):
+    """测试无效配置"""
+    assert DeepSeekProvider(config).validate_config() is False
+
+@pytest.mark.asyncio
+async def test_shared_session(deepseek_provider):
+    """测试所有提供商复用同一个HTTP会话"""
+    session = await deepseek_provider._get_session()
+    assert await BaseProvider._get_session() is session
+    assert not session.closed
+    assert json_loads(session.json_serialize({"content": "你好"})) == {"content": "你好"}
     
-    conversation = [
-        {"role": "user", "content": "Hi there"},
-        {"role": "assistant", "content": "Hello! How can I help?"}
+    await BaseProvider.close_session()
+    assert session.closed
+    assert await deepseek_provider._get_session() is not session
+
+def test_build_messages(deepseek_config):
+    """测试消息列表按固定系统提示、历史对话、动态上下文、用户问题的顺序组装"""
+    provider = DeepSeekProvider({**deepseek_config, "system_prompt": "你是助手"})
+    conversation = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    
+    messages = provider._build_messages("Bye", conversation, dynamic_context="今天是周一")
+    assert list(messages) == [
+        {"role": "system", "content": "你是助手"},
+        *conversation,
+        {"role": "system", "content": "今天是周一"},
+        {"role": "user", "content": "Bye"},
     ]
+    # 系统提示前缀在多次请求间保持同一对象
+    assert provider._build_messages("Hi")[0] is messages[0]
     
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 200
-        mock_context.__aenter__.return_value.json = AsyncMock(return_value=mock_response)
-        mock_post.return_value = mock_context
-        
-        # 测试无历史对话的情况
-        response = await deepseek_provider.generate_response("Hi")
-        assert response == "Hello!"
-        
-        # 测试有历史对话的情况
-        response = await deepseek_provider.generate_response("Hi", conversation)
-        assert response == "Hello!"
+    provider = DeepSeekProvider(dict(deepseek_config))
+    assert provider._build_messages("Hi") == ({"role": "user", "content": "Hi"},)
 
 @pytest.mark.asyncio
-async def test_generate_response_api_error(deepseek_provider):
-    """测试API错误时生成回答失败"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 400
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="API Error")
-        mock_post.return_value = mock_context
+async def test_iter_sse_data():
+    """测试按块读取时跨块的数据行能被正确切分"""
+    class ChunkedStream:
+        def __init__(self, blocks):
+            self.blocks = blocks
         
-        with pytest.raises(ProviderError) as exc_info:
-            await deepseek_provider.generate_response("Hi")
-        assert "API调用失败" in str(exc_info.value)
+        async def iter_chunked(self, size):
+            for block in self.blocks:
+                yield block
+    
+    stream = ChunkedStream([
+        b'data: {"a":',
+        b' 1}\r\n\n: keep-alive\n',
+        b'event: ping\ndata: [DONE]\ndata: tail',
+    ])
+    payloads = [payload async for payload in iter_sse_data(stream)]
+    assert payloads == [b'{"a": 1}', b"[DONE]", b"tail"]
+    
+    # 按很小的块读取时，数据行跨越多个块
+    content = MockContent([b'data: {"content":"Hello"}\n', b'data: [DONE]\n'])
+    payloads = [payload async for payload in iter_sse_data(content, chunk_size=5)]
+    assert payloads == [b'{"content":"Hello"}', b"[DONE]"]
 
 @pytest.mark.asyncio
-async def test_stream_response(deepseek_provider):
-    """测试流式生成回答"""
-    mock_chunks = [
-        b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n',
-        b'data: {"choices":[{"delta":{"content":" World"}}]}\n',
-        b'data: [DONE]\n'
-    ]
+async def test_batch_stream():
+    """测试流式片段按字符数和时间窗口合并"""
+    async def fast():
+        for chunk in ["a", "b", "c", "d", "e"]:
+            yield chunk
     
-    conversation = [
-        {"role": "user", "content": "Hi there"},
-        {"role": "assistant", "content": "Hello! How can I help?"}
-    ]
+    # 片段连续到达时按字符数合并，剩余部分在结束时输出
+    assert [c async for c in batch_stream(fast(), 10, 2)] == ["ab", "cd", "e"]
+    
+    async def slow():
+        yield "a"
+        yield "b"
+        await asyncio.sleep(0.05)
+        yield "c"
+    
+    # 时间窗口到达时即使下一个片段未到也会输出
+    assert [c async for c in batch_stream(slow(), 0.01, 100)] == ["ab", "c"]
 
-    class MockStream:
-        def __init__(self, chunks):
-            self.chunks = chunks
-            self.index = 0
-
-        def __aiter__(self):
-            return self
-
-        async def __anext__(self):
-            if self.index >= len(self.chunks):
-                raise StopAsyncIteration
-            chunk = self.chunks[self.index]
-            self.index += 1
-            return chunk
-
-    class MockResponse:
-        def __init__(self, chunks):
-            self.content = MockStream(chunks)
-            self.status = 200
-            
-        async def text(self):
-            return "Success"
-    
-    # 测试无历史对话的情况
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value = MockResponse(mock_chunks)
-        mock_post.return_value = mock_context
-        
-        chunks = []
-        async for chunk in deepseek_provider.stream_response("Hi"):
-            chunks.append(chunk)
-        assert len(chunks) == 2
-        assert chunks[0] == "Hello"
-        assert chunks[1] == " World"
-        
-    # 测试有历史对话的情况
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value = MockResponse(mock_chunks)
-        mock_post.return_value = mock_context
-        
-        chunks = []
-        async for chunk in deepseek_provider.stream_response("Hi", conversation):
-            chunks.append(chunk)
-        assert len(chunks) == 2
-        assert chunks[0] == "Hello"
-        assert chunks[1] == " World"
+@pytest.mark.asyncio
+async def test_batch_stream_closes_source():
+    """测试消费方提前停止时原始片段流被关闭，未完成的读取被取消"""
+    closed = []
+    
+    async def endless():
+        try:
+            while True:
+                yield "a"
+        finally:
+            closed.append("endless")
+    
+    batched = batch_stream(endless(), 10, 2)
+    assert await batched.__anext__() == "aa"
+    await batched.aclose()
+    assert closed == ["endless"]
+    
+    async def stalled():
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            closed.append("stalled")
+    
+    # 时间窗口到达后输出时，下一个片段的读取仍在等待
+    batched = batch_stream(stalled(), 0.01, 100)
+    assert await batched.__anext__() == "a"
+    await batched.aclose()
+    assert closed == ["endless", "stalled"]
+
+def test_extract_delta_content():
+    """测试从流式片段中直接取出内容，无法处理时返回None"""
+    assert extract_delta_content(b'{"choices":[{"index":0,"delta":{"content":"\xe4\xbd\xa0\xe5\xa5\xbd"}}]}') == "你好"
+    assert extract_delta_content(b'{"choices":[{"delta":{"content":""}}]}') == ""
+    # 含转义字符、内容为null、只有推理内容或JSON不完整时回退到完整解析
+    assert extract_delta_content(b'{"choices":[{"delta":{"content":"say \\"hi\\""}}]}') is None
+    assert extract_delta_content(b'{"choices":[{"delta":{"content":null}}]}') is None
+    assert extract_delta_content(b'{"choices":[{"delta":{"reasoning_content":"think"}}]}') is None
+    assert extract_delta_content(b'{"choices":[{"delta":{"content":"abc"') is None
+
+def test_json_helpers():
+    """测试JSON编解码辅助函数"""
+    data = {"messages": [{"role": "user", "content": "你好"}]}
+    encoded = json_dumps(data)
+    assert isinstance(encoded, bytes)
+    assert json_loads(encoded) == data
+    assert json_loads(encoded.decode("utf-8")) == data
+
+def test_encode_request(deepseek_config):
+    """测试请求体只重新序列化消息列表，固定字段变化时重新生成前缀"""
+    # 测试会修改配置，使用独立的提供商实例
+    provider = DeepSeekProvider(dict(deepseek_config))
+    messages = [{"role": "user", "content": "你好"}]
+    body = provider._encode_request(messages, stream=True)
+    assert json_loads(body) == {
+        "model": "deepseek-chat",
+        "temperature": 0.7,
+        "max_tokens": 100,
+        "stream": True,
+        "messages": messages,
+    }
+    
+    provider._encode_request(messages, stream=True)
+    assert len(provider._body_prefixes) == 1
+    
+    provider.config["temperature"] = 0.2
+    assert json_loads(provider._encode_request(messages, stream=False))["temperature"] == 0.2
+    assert len(provider._body_prefixes) == 2
+
+def test_openai_client_shared():
+    """测试相同API密钥的OpenAI提供商复用同一客户端"""
+    first = OpenAIProvider({"api_key": "test_key"})
+    second = OpenAIProvider({"api_key": "test_key"})
+    other = OpenAIProvider({"api_key": "other_key"})
+    assert first.client is second.client
+    assert first.client is not other.client
 
 @pytest.mark.asyncio
-async def test_stream_response_api_error(deepseek_provider):
-    """测试API错误时流式生成失败"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 400
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="API Error")
-        mock_post.return_value = mock_context
-        
-        with pytest.raises(ProviderError) as exc_info:
-            async for _ in deepseek_provider.stream_response("Hi"):
-                pass
-        assert "API调用失败" in str(exc_info.value)
+async def test_openai_client_cache_bounded(monkeypatch):
+    """测试客户端缓存超出容量时关闭最久未使用的客户端"""
+    monkeypatch.setattr(openai_provider, "CLIENT_CACHE_SIZE", 2)
+    monkeypatch.setattr(openai_provider, "_clients", OrderedDict())
+    
+    first = openai_provider.get_client("a")
+    second = openai_provider.get_client("b")
+    assert openai_provider.get_client("a") is first  # a变为最近使用
+    openai_provider.get_client("c")
+    assert list(openai_provider._clients) == ["a", "c"]
+    
+    await asyncio.gather(*openai_provider._closing)
+    assert second.is_closed()
+    assert not first.is_closed()
+    await asyncio.gather(*(client.close() for client in openai_provider._clients.values()))
 
-def test_validate_config(deepseek_provider):
-    """测试配置验证"""
-    assert deepseek_provider.validate_config() is True
+@pytest.mark.asyncio
+async def test_openai_key_check_not_cached():
+    """测试检查API密钥时使用独立的客户端并在检查后关闭，不放入共享缓存"""
+    client_cls = MagicMock()
+    client = client_cls.return_value.__aenter__.return_value
+    client.chat.completions.create = AsyncMock(side_effect=Exception("Invalid API key"))
     
-    # 测试无效配置
-    invalid_configs = [
-        {"api_key": "test", "temperature": 2.0},  # temperature超出范围
-        {"api_key": "test", "temperature": "0.7"},  # temperature类型错误
-        {"api_key": "test", "max_tokens": 0},  # max_tokens无效
-        {"api_key": "test", "max_tokens": "100"},  # max_tokens类型错误
-        {"api_key": "test", "stream": "true"},  # stream类型错误
-    ]
+    with patch.object(openai_provider, "AsyncOpenAI", client_cls):
+        assert await openai_provider.test_api_keys(["key1", "key2"]) == [False, False]
+    assert "key1" not in openai_provider._clients
+    assert client_cls.return_value.__aexit__.await_count == 2
+
+def test_llm_cache():
+    """测试回答缓存的LRU淘汰与过期"""
+    cache = LLMCache(max_size=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # a变为最近使用
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    
+    expired = LLMCache(ttl=-1)
+    expired.set("a", "1")
+    assert expired.get("a") is None
     
-    for config in invalid_configs:
-        provider = DeepSeekProvider(config)
-        assert provider.validate_config() is False
+    assert LLMCache.make_key(model="m", temperature=0) == LLMCache.make_key(temperature=0, model="m")
+    assert LLMCache.make_key(model="m") != LLMCache.make_key(model="n")
 
-@pytest.fixture
+@pytest.mark.asyncio
+async def test_generate_response_cached(deepseek_config, patched_post, post_mock):
+    """测试温度为0时相同请求复用缓存的回答"""
+    response_cache.clear()
+    mock_response = {"choices": [{"message": {"content": "Hello!"}}]}
+    
+    post_mock(SimpleNamespace(status=200, json=areturn(mock_response)))
+    
+    provider = DeepSeekProvider({**deepseek_config, "temperature": 0})
+    assert await provider.generate_response("Hi") == "Hello!"
+    assert await provider.generate_response("Hi") == "Hello!"
+    assert patched_post.call_count == 1
+    
+    # 仅有首尾空白或行内空格差异的问题命中同一缓存
+    assert await provider.generate_response("  Hi\n") == "Hello!"
+    await provider.generate_response("Hi  there")
+    await provider.generate_response("Hi\tthere")
+    assert patched_post.call_count == 2
+    
+    # 换行和缩进不同的问题不共享缓存
+    await provider.generate_response("Hi\nthere")
+    await provider.generate_response("if x:\n    y")
+    await provider.generate_response("if x:\ny")
+    assert patched_post.call_count == 5
+    
+    # 温度大于0时不使用缓存
+    provider = DeepSeekProvider(dict(deepseek_config))
+    await provider.generate_response("Hi")
+    await provider.generate_response("Hi")
+    assert patched_post.call_count == 7
+    response_cache.clear()
+
+@pytest.mark.asyncio
+async def test_generate_response_cache_per_base_url(deepseek_config, patched_post, post_mock):
+    """测试接口地址不同的同类提供商不共享缓存的回答"""
+    response_cache.clear()
+    post_mock(SimpleNamespace(status=200, json=areturn({"choices": [{"message": {"content": "Hello!"}}]})))
+    
+    public = DeepSeekProvider({**deepseek_config, "temperature": 0})
+    hosted = DeepSeekProvider({**deepseek_config, "temperature": 0, "base_url": "http://localhost:8000/v1"})
+    await public.generate_response("Hi")
+    await hosted.generate_response("Hi")
+    assert patched_post.call_count == 2
+    response_cache.clear()
+
+@pytest.fixture(scope="session")
 def api_key():
     """API密钥fixture"""
     return "test_key"
 
 @pytest.mark.asyncio
-async def test_api_key_test(api_key):
+async def test_api_key_test(api_key, post_mock):
     """测试API密钥验证"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 200
-        mock_context.__aenter__.return_value.json = AsyncMock(return_value={"choices": [{"message": {"content": "Hello"}}]})
-        mock_post.return_value = mock_context
-        assert await test_api_key("test_key") is True
-
-        # 测试无效密钥
-        mock_context.__aenter__.return_value.status = 401
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="Invalid API key")
-        assert await test_api_key("invalid_key") is False
+    # 在测试内导入，避免pytest把以test_开头的被测函数当作测试收集
+    from ai_agent.providers.deepseek import test_api_key
+    
+    post_mock(SimpleNamespace(status=200, json=areturn({"choices": [{"message": {"content": "Hello"}}]})))
+    assert await test_api_key(api_key) is True
+
+    # 测试无效密钥
+    post_mock(SimpleNamespace(status=401, text=areturn("Invalid API key")))
+    assert await test_api_key("invalid_key") is False
@@ -1,13 +1,18 @@
 """
 南科大Provider测试。
 """
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import aiohttp
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
 
-from ai_agent.providers.sustech import SustechProvider, verify_api_key
 from ai_agent.providers.base import ProviderError
+from ai_agent.providers.sustech import SustechProvider, verify_api_key, verify_api_keys
+
+from .conftest import acollect, areturn, make_mock_response
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sustech_config():
     """Sustech provider配置fixture"""
     return {
@@ -18,15 +23,14 @@ def sustech_config():
         "base_url": "https://chat.sustech.edu.cn/api"
     }
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sustech_provider(sustech_config):
     """Sustech provider实例fixture"""
-    return SustechProvider(sustech_config)
+    return SustechProvider(dict(sustech_config))
 
-@pytest.mark.asyncio
-async def test_sustech_init(sustech_config):
+def test_sustech_init(sustech_config):
     """测试Sustech provider初始化"""
-    provider = SustechProvider(sustech_config)
+    provider = SustechProvider(dict(sustech_config))
     assert provider.config["api_key"] == "test_key"
     assert provider.config["model"] == "deepseek-r1-250120"
     assert provider.config["temperature"] == 0.7
@@ -34,130 +38,73 @@ async def test_sustech_init(sustech_config):
     assert provider.config["base_url"] == "https://chat.sustech.edu.cn/api"
 
 @pytest.mark.asyncio
-async def test_sustech_init_no_api_key():
-    """测试没有API密钥时初始化失败"""
-    with pytest.raises(ProviderError) as exc_info:
-        SustechProvider({})
-    assert "未设置API密钥" in str(exc_info.value)
-
-@pytest.mark.asyncio
-async def test_generate_response(sustech_provider):
-    """测试生成回答"""
-    mock_response = {
-        "choices": [{
-            "message": {
-                "content": "Hello!"
-            }
-        }]
-    }
+async def test_stream_response_content_with_data_prefix(sustech_provider, post_mock):
+    """测试内容中包含"data: "时不被误删，非数据行被跳过"""
+    mock_chunks = [
+        b': keep-alive\n',
+        b'data: {"choices":[{"delta":{"content":"data: 42"}}]}\n',
+        b'\n',
+        b'data: [DONE]\n'
+    ]
     
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 200
-        mock_context.__aenter__.return_value.json = AsyncMock(return_value=mock_response)
-        mock_post.return_value = mock_context
-        
-        response = await sustech_provider.generate_response("Hi")
-        assert response == "Hello!"
-
-@pytest.mark.asyncio
-async def test_generate_response_api_error(sustech_provider):
-    """测试API错误时生成回答失败"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 400
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="API Error")
-        mock_post.return_value = mock_context
-        
-        with pytest.raises(ProviderError) as exc_info:
-            await sustech_provider.generate_response("Hi")
-        assert "API请求失败" in str(exc_info.value)
+    post_mock(make_mock_response(mock_chunks))
+    
+    chunks = await acollect(sustech_provider.stream_response("Hi"))
+    assert chunks == ["data: 42"]
 
 @pytest.mark.asyncio
-async def test_stream_response(sustech_provider):
-    """测试流式生成回答"""
-    mock_chunks = [
+async def test_stream_response_malformed_chunk(sustech_provider, post_mock):
+    """测试无效的响应片段中止流式生成"""
+    post_mock(make_mock_response([
         b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n',
-        b'data: {"choices":[{"delta":{"content":" World"}}]}\n',
+        b'data: {"choices":[{"delta":\n',
         b'data: [DONE]\n'
-    ]
-
-    class MockStream:
-        def __init__(self, chunks):
-            self.chunks = chunks
-            self.index = 0
-
-        def __aiter__(self):
-            return self
-
-        async def __anext__(self):
-            if self.index >= len(self.chunks):
-                raise StopAsyncIteration
-            chunk = self.chunks[self.index]
-            self.index += 1
-            return chunk
-
-    class MockResponse:
-        def __init__(self, chunks):
-            self.content = MockStream(chunks)
-            self.status = 200
-            
-        async def text(self):
-            return "Success"
+    ]))
     
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value = MockResponse(mock_chunks)
-        mock_post.return_value = mock_context
-        
-        chunks = []
-        async for chunk in sustech_provider.stream_response("Hi"):
-            chunks.append(chunk)
-        
-        assert len(chunks) == 2
-        assert chunks[0] == "Hello"
-        assert chunks[1] == " World"
+    with pytest.raises(ProviderError) as exc_info:
+        await acollect(sustech_provider.stream_response("Hi"))
+    assert exc_info.value.message.startswith("解析响应失败")
 
 @pytest.mark.asyncio
-async def test_stream_response_api_error(sustech_provider):
-    """测试API错误时流式生成失败"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 400
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="API Error")
-        mock_post.return_value = mock_context
-        
-        with pytest.raises(ProviderError) as exc_info:
-            async for _ in sustech_provider.stream_response("Hi"):
-                pass
-        assert "API请求失败" in str(exc_info.value)
+async def test_network_error(sustech_provider, patched_post):
+    """测试网络请求出错时的错误信息"""
+    patched_post.side_effect = aiohttp.ClientError("Network error")
+    
+    with pytest.raises(ProviderError) as exc_info:
+        await sustech_provider.generate_response("Hi")
+    assert exc_info.value.message == "HTTP请求错误: Network error"
 
 def test_validate_config(sustech_provider):
     """测试配置验证"""
     assert sustech_provider.validate_config() is True
-    
-    # 测试无效配置
-    invalid_configs = [
-        {"api_key": "test", "temperature": 2.1},  # temperature超出范围
-        {"api_key": "test", "temperature": "0.7"},  # temperature类型错误
-        {"api_key": "test", "max_tokens": 0},  # max_tokens无效
-        {"api_key": "test", "max_tokens": "100"},  # max_tokens类型错误
-    ]
-    
-    for config in invalid_configs:
-        provider = SustechProvider(config)
-        assert provider.validate_config() is False
+    # 南科大接口不校验stream配置项
+    assert SustechProvider({"api_key": "test", "stream": "true"}).validate_config() is True
+
+@pytest.mark.parametrize("config", [
+    {"api_key": "test", "temperature": 2.1},  # temperature超出范围
+    {"api_key": "test", "temperature": "0.7"},  # temperature类型错误
+    {"api_key": "test", "max_tokens": 0},  # max_tokens无效
+    {"api_key": "test", "max_tokens": "100"},  # max_tokens类型错误
+])
+def test_validate_config_invalid(config):
+    """测试无效配置"""
+    assert SustechProvider(config).validate_config() is False
 
 @pytest.mark.asyncio
-async def test_verify_api_key(sustech_config):
+async def test_verify_api_key(sustech_config, post_mock):
     """测试API密钥验证"""
-    with patch("aiohttp.ClientSession.post") as mock_post:
-        mock_context = AsyncMock()
-        mock_context.__aenter__.return_value.status = 200
-        mock_post.return_value = mock_context
-        assert await verify_api_key(sustech_config["api_key"]) is True
+    post_mock(SimpleNamespace(status=200))
+    assert await verify_api_key(sustech_config["api_key"]) is True
 
-        # 测试无效密钥
-        mock_context.__aenter__.return_value.status = 401
-        mock_context.__aenter__.return_value.text = AsyncMock(return_value="Invalid API key")
-        assert await verify_api_key("invalid_key") is False
+    # 测试无效密钥
+    post_mock(SimpleNamespace(status=401, text=areturn("Invalid API key")))
+    assert await verify_api_key("invalid_key") is False
+
+@pytest.mark.asyncio
+async def test_verify_api_keys():
+    """测试并发验证多个API密钥"""
+    async def fake_verify(api_key, base_url):
+        return api_key == "good"
+    
+    with patch("ai_agent.providers.sustech.verify_api_key", side_effect=fake_verify):
+        assert await verify_api_keys(["good", "bad", "good"]) == [True, False, True]